@@ -4,6 +4,8 @@ from fetchai.ledger.contract import Contract
 from fetchai.ledger.crypto import Entity
 from groq import Groq
 from config import GROQ_API_KEY
+from services.llm_cache import cached_completion
+from services.chat_context import ConversationContext
 
 class ChatAgent:
     def __init__(self, entity: Entity, contract: Contract):
@@ -11,6 +13,10 @@ class ChatAgent:
         self.contract = contract
         self.api = LedgerApi('127.0.0.1', 8000)
         self.groq_client = Groq(api_key=GROQ_API_KEY)
+        self.context = ConversationContext(
+            self.groq_client, "llama3-8b-8192",
+            system_prompt="You are a helpful travel assistant."
+        )
     
     def process_message(self, message, conversation_history=[]):
         """Process user message and generate response"""
@@ -20,23 +26,15 @@ class ChatAgent:
             self.entity, message=message
         )
         
-        # Generate response using Groq
-        response = self.groq_client.chat.completions.create(
-            messages=conversation_history + [
-                {
-                    "role": "system",
-                    "content": "You are a helpful travel assistant."
-                },
-                {
-                    "role": "user",
-                    "content": message
-                }
-            ],
-            model="llama3-8b-8192"
+        # Generate response using Groq within the token budget; older turns
+        # reach the model as a rolling summary (repeated questions come from the LLM cache)
+        assistant_response = cached_completion(
+            self.groq_client,
+            messages=self.context.build(conversation_history, message),
+            model="llama3-8b-8192",
+            semantic=True
         )
         
-        assistant_response = response.choices[0].message.content
-        
         # Store response on blockchain
         self.contract.action(
             self.api, 'storeResponse',
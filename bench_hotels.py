@@ -0,0 +1,88 @@
+# Benchmark the hotel normalizer on synthetic booking-com18 payloads
+import json
+import sys
+import time
+import tracemalloc
+from services.hotel_records import normalize_booking_results, hotels_from_rows
+
+def make_payload(n):
+    results = []
+    for i in range(n):
+        results.append({
+            "basicPropertyData": {
+                "id": i,
+                "name": f"Hotel {i}",
+                "reviews": {"totalScore": 8.1, "reviewsCount": 100 + i, "totalScoreTextTag": {"translation": "Very good"}},
+                "photos": {"main": {"lowResJpegUrl": {"absoluteUrl": f"https://example.com/{i}.jpg"}}},
+                "location": {"address": f"{i} Main Street", "latitude": 24.86 + i / 1e4, "longitude": 67.0 + i / 1e4},
+                "starRating": {"value": 1 + i % 5},
+            },
+            "priceDisplayInfo": {
+                "displayPrice": {"amountPerStay": {"amountRounded": f"US${80 + i % 200}"}},
+                "priceBeforeDiscount": {"amountPerStay": {"amountRounded": f"US${100 + i % 200}"}},
+            },
+            "priceBreakdown": {"grossPrice": {"amountRounded": f"US${80 + i % 200}"}},
+            "photoUrls": [f"https://example.com/{i}-{k}.jpg" for k in range(10)],
+            "recommendedDate": {"checkin": "2025-01-01", "checkout": "2025-01-05"},
+            "checkinCheckoutPolicy": {"checkinTimeFromFormatted": "14:00", "checkoutTimeUntilFormatted": "12:00"},
+        })
+    return json.dumps({"data": {"results": results}}).encode()
+
+def legacy_normalize(results):
+    # The previous nested .get() chain normalizer, kept for comparison
+    hotels = []
+    for hotel_data in results:
+        hotels.append({
+            'id': hotel_data.get('basicPropertyData', {}).get('id'),
+            'name': hotel_data.get('basicPropertyData', {}).get('name', 'Unknown Hotel'),
+            'price': hotel_data.get('priceDisplayInfo', {}).get('displayPrice', {}).get('amountPerStay', {}).get('amountRounded', 'N/A'),
+            'original_price': hotel_data.get('priceDisplayInfo', {}).get('priceBeforeDiscount', {}).get('amountPerStay', {}).get('amountRounded', ''),
+            'review_score': hotel_data.get('basicPropertyData', {}).get('reviews', {}).get('totalScore', 0),
+            'review_count': hotel_data.get('basicPropertyData', {}).get('reviews', {}).get('reviewsCount', 0),
+            'review_word': hotel_data.get('basicPropertyData', {}).get('reviews', {}).get('totalScoreTextTag', {}).get('translation', 'No reviews'),
+            'photo_url': hotel_data.get('basicPropertyData', {}).get('photos', {}).get('main', {}).get('lowResJpegUrl', {}).get('absoluteUrl', ''),
+            'address': hotel_data.get('basicPropertyData', {}).get('location', {}).get('address', ''),
+            'checkin_date': hotel_data.get('recommendedDate', {}).get('checkin', ''),
+            'checkout_date': hotel_data.get('recommendedDate', {}).get('checkout', ''),
+            'checkin_time': hotel_data.get('checkinCheckoutPolicy', {}).get('checkinTimeFromFormatted', ''),
+            'checkout_time': hotel_data.get('checkinCheckoutPolicy', {}).get('checkoutTimeUntilFormatted', ''),
+            'property_class': hotel_data.get('basicPropertyData', {}).get('starRating', {}).get('value', 0),
+            'longitude': hotel_data.get('basicPropertyData', {}).get('location', {}).get('longitude'),
+            'latitude': hotel_data.get('basicPropertyData', {}).get('location', {}).get('latitude'),
+        })
+    return hotels
+
+def records_normalize(results):
+    return hotels_from_rows(normalize_booking_results(results))
+
+def measure(fn, body, repeat):
+    # Decoding is shared by both implementations, so it is timed separately
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = json.loads(body)["data"]["results"]
+    decode = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(results)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    # Memory held by the normalized hotels once the raw payload is dropped
+    tracemalloc.start()
+    results = json.loads(body)["data"]["results"]
+    hotels = fn(results)
+    del results
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del hotels
+    return decode, elapsed, held
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 500, 2000]
+    print(f"{'hotels':>7} {'impl':>8} {'decode ms':>10} {'normalize ms':>13} {'hotels/s':>10} {'KiB held':>9}")
+    for n in sizes:
+        body = make_payload(n)
+        repeat = max(3, 20000 // n)
+        for name, fn in (("legacy", legacy_normalize), ("records", records_normalize)):
+            decode, elapsed, held = measure(fn, body, repeat)
+            print(f"{n:>7} {name:>8} {decode * 1000:>10.2f} {elapsed * 1000:>13.2f} {n / elapsed:>10.0f} {held / 1024:>9.0f}")
@@ -1,12 +1,18 @@
 import streamlit as st
 from datetime import datetime
-from neo4j import GraphDatabase
 from groq import Groq
-from config import GROQ_API_KEY, NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD
+from config import GROQ_API_KEY, CHAT_STREAMING, TTS_BITRATE
+from services.graph_writer import register_event_type, enqueue
+from services.llm_cache import cached_completion, cached_stream
+from services.chat_context import ConversationContext
 
 import speech_recognition as sr
 from gtts import gTTS
 import base64
+import io
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from tempfile import NamedTemporaryFile
 import time
 
@@ -28,6 +34,66 @@ def speak(text):
         st.warning(f"⚠️ Speech failed: {e}")
         st.info(f"🔊 Assistant says: {text}")
 
+# ========== Streaming Speech ==========
+_SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*\s+")
+_tts_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tts")
+
+def _synthesize(sentence):
+    buffer = io.BytesIO()
+    gTTS(sentence).write_to_fp(buffer)
+    return buffer.getvalue()
+
+class SentenceSpeaker:
+    """Speaks a streamed reply one sentence at a time, as soon as each closes.
+
+    Sentences are synthesized in the background while generation continues
+    and played strictly in order: the next clip is only emitted once the
+    previous one has finished (duration estimated from the MP3 bitrate).
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._queue = deque()  # futures of mp3 bytes, in sentence order
+        self._free_at = 0.0
+
+    def feed(self, text):
+        self._buffer += text
+        while True:
+            match = _SENTENCE_END.search(self._buffer)
+            if not match:
+                break
+            self._submit(self._buffer[:match.end()])
+            self._buffer = self._buffer[match.end():]
+        self._play_ready(wait=False)
+
+    def finish(self):
+        """Speak whatever is left and block until the last clip has played"""
+        self._submit(self._buffer)
+        self._buffer = ""
+        self._play_ready(wait=True)
+        time.sleep(max(0.0, self._free_at - time.monotonic()))
+
+    def _submit(self, sentence):
+        if sentence.strip():
+            self._queue.append(_tts_pool.submit(_synthesize, sentence.strip()))
+
+    def _play_ready(self, wait):
+        while self._queue and (wait or (self._queue[0].done() and time.monotonic() >= self._free_at)):
+            if wait:
+                time.sleep(max(0.0, self._free_at - time.monotonic()))
+            try:
+                audio = self._queue.popleft().result()
+            except Exception as e:
+                st.warning(f"⚠️ Speech failed: {e}")
+                continue
+            b64 = base64.b64encode(audio).decode()
+            st.markdown(f'''
+            <audio autoplay>
+                <source src="data:audio/mp3;base64,{b64}" type="audio/mp3">
+            </audio>
+            ''', unsafe_allow_html=True)
+            self._free_at = time.monotonic() + len(audio) * 8 / TTS_BITRATE
+
 # ========== Voice Input ==========
 def listen_once():
     recognizer = sr.Recognizer()
@@ -55,26 +121,43 @@ def listen_once():
         return None
 
 # ========== Neo4j ==========
+register_event_type("conversation", """
+    UNWIND $events AS e
+    MERGE (u:User {id: e.user_id})
+    CREATE (m:Message {text: e.message, timestamp: datetime(e.ts)})
+    CREATE (r:Response {text: e.response, timestamp: datetime(e.ts)})
+    CREATE (u)-[:SENT]->(m)
+    CREATE (m)-[:GENERATED]->(r)
+""")
+
 def store_conversation(user_id, message, response):
-    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
-    try:
-        with driver.session() as session:
-            session.run("""
-                MERGE (u:User {id: $user_id})
-                CREATE (m:Message {text: $message, timestamp: datetime()})
-                CREATE (r:Response {text: $response, timestamp: datetime()})
-                CREATE (u)-[:SENT]->(m)
-                CREATE (m)-[:GENERATED]->(r)
-            """, user_id=user_id, message=message, response=response)
-    except Exception:
-        pass
-    finally:
-        driver.close()
+    enqueue("conversation", user_id=user_id, message=message, response=response)
 
 # ========== Process Message ==========
+def stream_response(client, messages, speaker=None):
+    """Render the reply token by token; the speaker (voice mode) gets each delta too"""
+    placeholder = st.empty()
+    parts = []
+    for delta in cached_stream(client, messages=messages, model="llama3-8b-8192", semantic=True):
+        parts.append(delta)
+        placeholder.markdown(f"**🤖 Assistant:** {''.join(parts)}▌")
+        if speaker is not None:
+            speaker.feed(delta)
+    reply = "".join(parts)
+    placeholder.markdown(f"**🤖 Assistant:** {reply}")
+    if speaker is not None:
+        speaker.finish()
+    return reply
+
 def process_message(message):
     client = Groq(api_key=GROQ_API_KEY)
 
+    # The context (and its rolling summary) lives for the whole session
+    if "chat_context" not in st.session_state:
+        st.session_state.chat_context = ConversationContext(client, "llama3-8b-8192")
+    context = st.session_state.chat_context
+    context.client = client
+
     st.session_state.conversation.append({
         'role': 'user',
         'content': message,
@@ -82,11 +165,20 @@ def process_message(message):
     })
 
     try:
-        response = client.chat.completions.create(
-            messages=[{"role": "user", "content": message}],
-            model="llama3-8b-8192"
-        )
-        assistant_response = response.choices[0].message.content
+        messages = context.build(st.session_state.conversation[:-1], message)
+        voice = st.session_state.get("voice_mode_active", False)
+        # Repeated and near-duplicate questions are answered from the LLM cache
+        if CHAT_STREAMING:
+            assistant_response = stream_response(
+                client, messages, speaker=SentenceSpeaker() if voice else None
+            )
+        else:
+            assistant_response = cached_completion(
+                client,
+                messages=messages,
+                model="llama3-8b-8192",
+                semantic=True
+            )
 
         store_conversation(
             st.session_state.user_id,
@@ -100,7 +192,7 @@ def process_message(message):
             'timestamp': datetime.now().isoformat()
         })
 
-        if st.session_state.get("voice_mode_active", False):
+        if voice and not CHAT_STREAMING:
             speak(assistant_response)
 
         return assistant_response
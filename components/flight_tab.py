@@ -1,49 +1,48 @@
 import streamlit as st
-import requests
+import pandas as pd
 from datetime import datetime, timedelta
-from neo4j import GraphDatabase
-from config import RAPIDAPI_KEY, LOCATIONIQ_API_KEY, NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD
+from config import (
+    RAPIDAPI_KEY, AIRPORT_SEARCH_RADIUS_KM, PLACE_RESOLUTION_TTL,
+    FARE_CALENDAR_DEFAULT_DAYS, FARE_CALENDAR_MAX_DAYS, FARE_CALENDAR_DEADLINE
+)
+from services import http_client
+from services.geocode_cache import locationiq_search, normalize_query
+from services.airport_index import nearest_airport
+from services.graph_writer import register_event_type, enqueue
+from services.single_flight import SingleFlight
+from services.ttl_cache import TTLCache
+from services.response_cache import get_cache
+from services.fanout import fan_out
+from services.fx_rates import format_amount
+from components.ui_utils import localize_prices
+from concurrent.futures import ThreadPoolExecutor
 import re
 
-# --- Airport lookup for Neo4j logging ---
-def get_airport_iata(city):
-    geo = requests.get(
-        "https://us1.locationiq.com/v1/search.php",
-        params={"key": LOCATIONIQ_API_KEY, "q": city, "format": "json", "limit": 1}
-    )
-    if geo.status_code != 200 or not geo.json():
-        st.error(f"LocationIQ error for '{city}'")
-        return None
-    lat, lon = geo.json()[0]["lat"], geo.json()[0]["lon"]
+# --- Place resolution: geocode each place once -> IATA code + Kiwi slug ---
+_place_cache = TTLCache(maxsize=1024, ttl=PLACE_RESOLUTION_TTL)
+_place_flight = SingleFlight()
+_resolver_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="place-resolver")
+_flight_cache = get_cache("flights")
+
+def _nearest_iata(lat, lon):
+    """(iata, airport name) from the offline index, falling back to Aerodatabox"""
+    try:
+        ap = nearest_airport(lat, lon, max_km=AIRPORT_SEARCH_RADIUS_KM)
+    except Exception as e:
+        print(f"Airport index unavailable: {e}")
+        ap = None
+    if ap:
+        return ap["iata"], ap["name"]
 
-    nearest = requests.get(
+    nearest = http_client.get(
         f"https://aerodatabox.p.rapidapi.com/airports/search/location/{lat}/{lon}/km/100/16",
         headers={"X-RapidAPI-Key": RAPIDAPI_KEY, "X-RapidAPI-Host": "aerodatabox.p.rapidapi.com"}
     )
-    if nearest.status_code != 200 or not nearest.json().get("items"):
-        st.error(f"No airports found near '{city}'")
-        return None
-
-    for ap in nearest.json()["items"]:
-        if ap.get("iata"):
-            st.info(f"✈️ {city}: {ap['name']} ({ap['iata']})")
-            return ap["iata"]
-    return None
-
-# --- Save search to Neo4j ---
-def store_search(u, o, d, date, p):
-    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
-    with driver.session() as s:
-        s.run("""
-          MERGE (u:User{id:$u})
-          MERGE (o:Airport{code:$o})
-          MERGE (d:Airport{code:$d})
-          CREATE (s:Search{type:'flight',date:$date,passengers:$p,timestamp:datetime()})
-          CREATE (u)-[:SEARCHED]->(s)
-          CREATE (s)-[:FROM]->(o)
-          CREATE (s)-[:TO]->(d)
-        """, u=u, o=o, d=d, date=date, p=p)
-    driver.close()
+    if nearest.status_code == 200:
+        for ap in nearest.json().get("items", []):
+            if ap.get("iata"):
+                return ap["iata"], ap["name"]
+    return None, None
 
 # --- Format for Kiwi API ---
 def format_kiwi_location(name, country_code=None, is_country=False):
@@ -52,54 +51,108 @@ def format_kiwi_location(name, country_code=None, is_country=False):
         return f"Country:{country_code.upper()}"
     return f"City:{slug}_{country_code.lower()}"
 
+def _kiwi_location(place_name, data):
+    """Kiwi City:/Country: slug from a LocationIQ match (REST Countries fallback)"""
+    address = data.get("address", {})
+    country_code = address.get("country_code")
+
+    if not country_code:
+        display_name = data.get("display_name", "")
+        country_name = display_name.split(",")[-1].strip()
+        iso_lookup = http_client.get(f"https://restcountries.com/v3.1/name/{country_name}")
+        if iso_lookup.status_code == 200:
+            iso_data = iso_lookup.json()
+            country_code = iso_data[0]["cca2"].lower()
+
+    country_code = country_code.upper() if country_code else "XX"
+
+    city = (
+        address.get("city") or address.get("town") or address.get("village") or
+        data.get("display_name", "").split(",")[0].strip()
+    )
+    is_country = data.get("type") == "country"
+
+    return format_kiwi_location(city or place_name, country_code, is_country=is_country)
+
+def _resolve_place(place_name):
+    data = locationiq_search(place_name)
+    if not data:
+        return None
+    lat, lon = float(data["lat"]), float(data["lon"])
+    iata, airport = _nearest_iata(lat, lon)
+    return {
+        "query": place_name,
+        "lat": lat,
+        "lon": lon,
+        "iata": iata,
+        "airport": airport,
+        "kiwi": _kiwi_location(place_name, data),
+    }
+
+def resolve_place(place_name):
+    """Resolve a city/country once; identical in-flight lookups share one call"""
+    key = normalize_query(place_name)
+    place = _place_cache.get(key)
+    if place is None:
+        place = _place_flight.do(key, _resolve_place, place_name)
+        if place is not None:
+            _place_cache.set(key, place)
+    return place
+
+def resolve_route(origin, dest):
+    """Resolve origin and destination concurrently"""
+    origin_future = _resolver_pool.submit(resolve_place, origin)
+    dest_future = _resolver_pool.submit(resolve_place, dest)
+    return origin_future.result(), dest_future.result()
+
+# --- Airport lookup for Neo4j logging ---
+def get_airport_iata(city):
+    try:
+        place = resolve_place(city)
+    except Exception:
+        place = None
+    if not place:
+        st.error(f"LocationIQ error for '{city}'")
+        return None
+    if not place["iata"]:
+        st.error(f"No airports found near '{city}'")
+        return None
+    st.info(f"✈️ {city}: {place['airport']} ({place['iata']})")
+    return place["iata"]
+
 # --- Resolve input using LocationIQ + fallback to REST Countries API ---
 def get_kiwi_location_format(place_name):
-    url = "https://us1.locationiq.com/v1/search.php"
-    params = {"key": LOCATIONIQ_API_KEY, "q": place_name, "format": "json", "limit": 1}
     try:
-        r = requests.get(url, params=params)
-        raw = r.json()
-        st.write(f"📍 LocationIQ Response for '{place_name}':", raw)
-        data = raw[0]
-
-        address = data.get("address", {})
-        country_code = address.get("country_code")
-
-        if not country_code:
-            display_name = data.get("display_name", "")
-            country_name = display_name.split(",")[-1].strip()
-            iso_lookup = requests.get(f"https://restcountries.com/v3.1/name/{country_name}")
-            if iso_lookup.status_code == 200:
-                iso_data = iso_lookup.json()
-                country_code = iso_data[0]["cca2"].lower()
-
-        country_code = country_code.upper() if country_code else "XX"
-
-        city = (
-            address.get("city") or address.get("town") or address.get("village") or
-            data.get("display_name", "").split(",")[0].strip()
-        )
-        is_country = data.get("type") == "country"
-
-        location = format_kiwi_location(city or place_name, country_code, is_country=is_country)
-        st.write(f"✅ Formatted Kiwi Location for '{place_name}': {location}")
-        return location
+        place = resolve_place(place_name)
+        if place is None:
+            raise ValueError("no LocationIQ match")
+        st.write(f"✅ Formatted Kiwi Location for '{place_name}': {place['kiwi']}")
+        return place["kiwi"]
     except Exception as e:
         st.error(f"Location formatting failed for {place_name}: {e}")
         return None
 
-# --- Call Kiwi API ---
-def search_flights(origin_input, dest_input):
-    source = get_kiwi_location_format(origin_input)
-    dest = get_kiwi_location_format(dest_input)
+# --- Save search to Neo4j (batched by the background graph writer) ---
+register_event_type("flight_search", """
+  UNWIND $events AS e
+  MERGE (u:User{id:e.u})
+  MERGE (o:Airport{code:e.o})
+  MERGE (d:Airport{code:e.d})
+  CREATE (s:Search{type:'flight',date:e.date,passengers:e.p,timestamp:datetime(e.ts)})
+  CREATE (u)-[:SEARCHED]->(s)
+  CREATE (s)-[:FROM]->(o)
+  CREATE (s)-[:TO]->(d)
+""")
 
-    st.write("🔧 Kiwi API Params:")
-    st.code(f"source = {source}\ndestination = {dest}", language="yaml")
+def store_search(u, o, d, date, p):
+    enqueue("flight_search", u=u, o=o, d=d, date=date, p=p)
 
-    if not source or not dest:
-        st.error("❌ Could not resolve city/country input.")
-        return [], {}
+# --- Call Kiwi API (responses cached with stale-while-revalidate) ---
+def fetch_kiwi_itineraries(source, dest, date=None, adults=1):
+    """Kiwi round-trip search for two resolved slugs; raises on HTTP errors.
 
+    With a date (YYYY-MM-DD) only itineraries departing that day are returned.
+    """
     url = "https://kiwi-com-cheap-flights.p.rapidapi.com/round-trip"
     headers = {
         "X-RapidAPI-Key": RAPIDAPI_KEY,
@@ -110,7 +163,7 @@ def search_flights(origin_input, dest_input):
         "destination": dest,
         "currency": "usd",
         "locale": "en",
-        "adults": 1,
+        "adults": adults,
         "children": 0,
         "infants": 0,
         "handbags": 1,
@@ -132,20 +185,95 @@ def search_flights(origin_input, dest_input):
         "contentProviders": "FLIXBUS_DIRECTS,FRESH,KAYAK,KIWI",
         "limit": 5
     }
+    if date:
+        params["outboundDepartureDateStart"] = f"{date}T00:00:00"
+        params["outboundDepartureDateEnd"] = f"{date}T23:59:59"
+
+    res = http_client.get(url, headers=headers, params=params)
+    res.raise_for_status()
+    data = res.json()
+    return {"itineraries": data.get("itineraries", []), "metadata": data.get("metadata", {})}
+
+def fetch_day(source, dest, date, adults=1):
+    """One route/day/passenger count, cached separately so calendars share days"""
+    return _flight_cache.get_or_fetch(
+        {"source": source, "destination": dest, "date": date, "adults": adults},
+        lambda: fetch_kiwi_itineraries(source, dest, date, adults),
+        should_cache=lambda d: bool(d["itineraries"])
+    )
+
+def search_flights(origin_input, dest_input, places=None, date=None, adults=1):
+    if places is None:
+        try:
+            places = resolve_route(origin_input, dest_input)
+        except Exception as e:
+            st.error(f"Location formatting failed: {e}")
+            places = (None, None)
+    source = places[0]["kiwi"] if places[0] else None
+    dest = places[1]["kiwi"] if places[1] else None
+
+    st.write("🔧 Kiwi API Params:")
+    st.code(f"source = {source}\ndestination = {dest}", language="yaml")
+
+    if not source or not dest:
+        st.error("❌ Could not resolve city/country input.")
+        return [], {}
 
     try:
-        res = requests.get(url, headers=headers, params=params)
-        st.write(f"📡 Kiwi API Response [{res.status_code}]: {res.text[:500]}...")
-
-        if res.status_code == 200:
-            data = res.json()
-            return data.get("itineraries", []), data.get("metadata", {})
-        else:
-            st.error(f"Kiwi API error: {res.status_code}")
+        data = fetch_day(source, dest, date, adults)
+        return data["itineraries"], data["metadata"]
     except Exception as e:
         st.error(f"API failure: {e}")
     return [], {}
 
+# --- Fare calendar: one cached query per day, fetched concurrently ---
+def cheapest_fare(itineraries):
+    prices = []
+    for itinerary in itineraries:
+        try:
+            prices.append(float(itinerary.get("price", {}).get("amount")))
+        except (TypeError, ValueError):
+            continue
+    return min(prices) if prices else None
+
+def fare_calendar(source, dest, center, days, adults=1):
+    """{date: itineraries} for center ± days (past days skipped).
+
+    Every day is its own cache entry, so widening the window only queries
+    days not fetched before; the per-host rate limiter paces the burst.
+    """
+    today = datetime.now().date()
+    dates = [
+        (center + timedelta(days=offset)).strftime("%Y-%m-%d")
+        for offset in range(-days, days + 1)
+        if center + timedelta(days=offset) >= today
+    ]
+    tasks = {d: (lambda d=d: fetch_day(source, dest, d, adults)["itineraries"]) for d in dates}
+    results, timed_out, errors = fan_out(tasks, FARE_CALENDAR_DEADLINE)
+    if timed_out or errors:
+        st.warning(f"No fares for {len(timed_out) + len(errors)} of {len(dates)} days (provider slow or failing)")
+    return {d: results.get(d) for d in dates}
+
+def display_fare_calendar(calendar):
+    """Cheapest fare per day as a week × weekday matrix"""
+    fares = {datetime.strptime(d, "%Y-%m-%d").date(): cheapest_fare(its or []) for d, its in calendar.items()}
+    if not fares:
+        return
+    days = sorted(fares)
+    values, currency = localize_prices([fares[day] for day in days])
+    fares = dict(zip(days, values))
+    first = days[0]
+    week_start = first - timedelta(days=first.weekday())
+    weekdays = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+    matrix = {}
+    for day, fare in sorted(fares.items()):
+        week = (week_start + timedelta(weeks=(day - week_start).days // 7)).strftime("Week of %d %b")
+        matrix.setdefault(week, {name: None for name in weekdays})[weekdays[day.weekday()]] = fare
+    table = pd.DataFrame.from_dict(matrix, orient="index", columns=weekdays).astype(float)
+
+    st.subheader(f"📅 Fare calendar (cheapest {currency} per departure day)")
+    st.dataframe(table.style.highlight_min(axis=None, color="#c8f7c5").format("{:.0f}", na_rep="–"))
+
 # --- Display Flights ---
 def display_flights(itineraries, origin, dest, metadata=None):
     if not itineraries:
@@ -154,9 +282,10 @@ def display_flights(itineraries, origin, dest, metadata=None):
 
     st.subheader(f"🛫 {len(itineraries)} Itineraries from {origin} → {dest}")
 
+    prices, currency = localize_prices([it.get("price", {}).get("amount") for it in itineraries])
     for i, itinerary in enumerate(itineraries, 1):
         try:
-            price = itinerary.get("price", {}).get("amount", "N/A")
+            price = format_amount(prices[i - 1], currency)
             outbound = itinerary.get("outbound", {}).get("sectorSegments", [])[0].get("segment", {})
             inbound = itinerary.get("inbound", {}).get("sectorSegments", [])[0].get("segment", {})
 
@@ -172,7 +301,7 @@ def display_flights(itineraries, origin, dest, metadata=None):
             **Airline:** {airline}  
             🟢 **Depart:** {dep_time} → {arr_time}  
             🔁 **Return:** {ret_time} → {ret_arr_time}  
-            💵 **Price:** {price} USD  
+            💵 **Price:** {price}  
             ---
             """)
 
@@ -193,12 +322,38 @@ def flight_tab():
     dcity = st.text_input("To (city or country)", "Dubai")
     date = st.date_input("Date", datetime.now() + timedelta(days=7))
     pax = st.number_input("Passengers", 1, 9, 1)
+    flexible = st.checkbox("Flexible dates (fare calendar)")
+    window = st.slider("± days", 1, FARE_CALENDAR_MAX_DAYS, FARE_CALENDAR_DEFAULT_DAYS) if flexible else 0
 
     if st.button("Search Flights"):
-        oi = get_airport_iata(ocity)
-        di = get_airport_iata(dcity)
-        if oi and di:
-            trips, metadata = search_flights(ocity, dcity)
+        # Geocode both places once, concurrently, for the IATA codes and Kiwi slugs
+        with st.spinner("Resolving locations..."):
+            try:
+                origin, destination = resolve_route(ocity, dcity)
+            except Exception as e:
+                st.error(f"Location lookup failed: {e}")
+                return
+
+        for city, place in ((ocity, origin), (dcity, destination)):
+            if not place:
+                st.error(f"LocationIQ error for '{city}'")
+            elif not place["iata"]:
+                st.error(f"No airports found near '{city}'")
+            else:
+                st.info(f"✈️ {city}: {place['airport']} ({place['iata']})")
+
+        if origin and destination and origin["iata"] and destination["iata"]:
+            day = date.strftime("%Y-%m-%d")
+            if flexible and origin["kiwi"] and destination["kiwi"]:
+                with st.spinner(f"Checking fares for {2 * window + 1} days..."):
+                    calendar = fare_calendar(origin["kiwi"], destination["kiwi"], date, window, pax)
+                display_fare_calendar(calendar)
+                # Itineraries for the cheapest day in the window (the chosen day if none priced)
+                priced = {d: cheapest_fare(its) for d, its in calendar.items() if its and cheapest_fare(its) is not None}
+                if priced:
+                    day = min(priced, key=priced.get)
+                    st.info(f"Cheapest departure: {day}")
+            trips, metadata = search_flights(ocity, dcity, places=(origin, destination), date=day, adults=pax)
             if "user_id" in st.session_state:
-                store_search(st.session_state.user_id, oi, di, date.strftime("%Y-%m-%d"), pax)
+                store_search(st.session_state.user_id, origin["iata"], destination["iata"], day, pax)
             display_flights(trips, ocity, dcity, metadata)
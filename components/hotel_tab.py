@@ -1,8 +1,20 @@
+import math
 import streamlit as st
-import requests
 from datetime import datetime, timedelta
-from neo4j import GraphDatabase
-from config import RAPIDAPI_KEY, NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD
+from config import (
+    RAPIDAPI_KEY, HOTELS_PER_PAGE, HOTEL_SEARCH_RADIUS_DEG, HOTEL_TILE_PRECISION, HOTEL_SEARCH_DEADLINE
+)
+from services import http_client, geohash
+from services.fanout import fan_out
+from services.geocode_cache import nominatim_search
+from services.graph_writer import register_event_type, enqueue
+from services.response_cache import get_cache
+from services.hotel_records import HOTEL_FIELDS, HOTEL_SCHEMA, normalize_booking_results
+from services.hotel_table import HotelTable
+from services.fx_rates import format_amount
+from components.ui_utils import localize_prices
+
+_hotel_cache = get_cache("hotels")
 
 # Custom CSS for modern design
 def load_css():
@@ -39,130 +51,161 @@ def load_css():
     </style>
     """, unsafe_allow_html=True)
 
-def get_driver():
-    return GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
+register_event_type("hotel_search", """
+    UNWIND $events AS e
+    MERGE (u:User {id: e.user_id})
+    MERGE (c:City {name: e.location})
+    CREATE (s:Search {
+        type: 'hotel',
+        checkin: e.checkin,
+        checkout: e.checkout,
+        guests: e.guests,
+        timestamp: datetime(e.ts)
+    })
+    CREATE (u)-[:SEARCHED]->(s)
+    CREATE (s)-[:IN]->(c)
+""")
 
 def store_hotel_search(user_id, location, checkin, checkout, guests):
-    driver = get_driver()
-    try:
-        with driver.session() as session:
-            session.run("""
-            MERGE (u:User {id: $user_id})
-            MERGE (c:City {name: $location})
-            CREATE (s:Search {
-                type: 'hotel',
-                checkin: $checkin,
-                checkout: $checkout,
-                guests: $guests,
-                timestamp: datetime()
-            })
-            CREATE (u)-[:SEARCHED]->(s)
-            CREATE (s)-[:IN]->(c)
-            """, 
-            user_id=user_id, location=location, 
-            checkin=checkin, checkout=checkout, guests=guests)
-    except Exception as e:
-        st.error(f"Failed to save search: {str(e)}")
-    finally:
-        driver.close()
+    if not enqueue("hotel_search", user_id=user_id, location=location,
+                   checkin=checkin, checkout=checkout, guests=guests):
+        st.warning("Search history is busy; this search was not saved")
 
 def get_location_coordinates(destination):
     try:
-        url = "https://nominatim.openstreetmap.org/search"
-        params = {
-            "q": destination,
-            "format": "json",
-            "limit": 1
-        }
-        headers = {"User-Agent": "hotel-search-app"}
-        
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        if response.status_code == 200 and response.json():
-            data = response.json()[0]
+        data = nominatim_search(destination)
+        if data:
             return float(data["lat"]), float(data["lon"])
         return None, None
     except Exception as e:
         st.error(f"Geocoding error: {str(e)}")
         return None, None
 
-def search_hotels(destination, checkin, checkout, guests):
+def fetch_hotels_in_box(sw_lat, sw_lon, ne_lat, ne_lon, checkin, checkout, guests):
+    """booking-com18 search-by-geo over a bounding box; raises on HTTP errors"""
     url = "https://booking-com18.p.rapidapi.com/stays/search-by-geo"
     headers = {
         "X-RapidAPI-Key": RAPIDAPI_KEY,
         "X-RapidAPI-Host": "booking-com18.p.rapidapi.com"
     }
+    params = {
+        "neLat": ne_lat,
+        "neLng": ne_lon,
+        "swLat": sw_lat,
+        "swLng": sw_lon,
+        "units": "metric",
+        "checkinDate": checkin,
+        "checkoutDate": checkout,
+        "adults": str(guests),
+        "order_by": "popularity",
+        "currency": "USD"
+    }
+
+    response = http_client.get(url, headers=headers, params=params, timeout=30)
+    response.raise_for_status()
+    # Rows in HOTEL_FIELDS order: compact and storable by every cache backend
+    return normalize_booking_results((response.json().get("data") or {}).get("results") or [])
+
+_ID, _LAT, _LON = HOTEL_FIELDS.index("id"), HOTEL_FIELDS.index("latitude"), HOTEL_FIELDS.index("longitude")
+
+def fetch_tile(tile, checkin, checkout, guests):
+    """Rows for one geohash tile, through the response cache"""
+    return _hotel_cache.get_or_fetch(
+        {"tile": tile, "checkin": checkin, "checkout": checkout,
+         "guests": guests, "schema": HOTEL_SCHEMA},
+        lambda: fetch_hotels_in_box(*geohash.decode_bbox(tile), checkin, checkout, guests)
+    )
+
+def assemble_tiles(tile_rows, box):
+    """Merge tile results inside the query box, interleaving tiles to keep popularity order"""
+    sw_lat, sw_lon, ne_lat, ne_lon = box
+    rows, seen = [], set()
+    for rank in range(max((len(r) for r in tile_rows), default=0)):
+        for tile in tile_rows:
+            if rank >= len(tile):
+                continue
+            row = tile[rank]
+            if row[_ID] in seen:
+                continue
+            lat, lon = row[_LAT], row[_LON]
+            if lat is not None and lon is not None and not (sw_lat <= lat <= ne_lat and sw_lon <= lon <= ne_lon):
+                continue
+            seen.add(row[_ID])
+            rows.append(row)
+    return rows
 
+def search_hotels(destination, checkin, checkout, guests):
+    """HotelTable of results around the destination ([] on failure)"""
     try:
         lat, lon = get_location_coordinates(destination)
         if not lat or not lon:
             st.error("Could not determine location coordinates")
             return []
 
-        params = {
-            "neLat": lat + 0.5,
-            "neLng": lon + 0.5,
-            "swLat": lat - 0.5,
-            "swLng": lon - 0.5,
-            "units": "metric",
-            "checkinDate": checkin,
-            "checkoutDate": checkout,
-            "adults": str(guests),
-            "order_by": "popularity",
-            "currency": "USD"
-        }
-
-        response = requests.get(url, headers=headers, params=params, timeout=30)
-        
-        if response.status_code == 200:
-            data = response.json()
-            hotels = []
-            response_json = response.json()
-            hotel_list = response_json.get("data", {}).get("results", [])
-            for index, hotel_data in enumerate(hotel_list):
-                try:
-                    photo_urls = hotel_data['photoUrls'] if 'photoUrls' in hotel_data and isinstance(hotel_data['photoUrls'], list) else []
-                    first_photo_url = photo_urls[0] if photo_urls else ''
-
-                    price = hotel_data['priceBreakdown']['grossPrice']['amountRounded'] if 'priceBreakdown' in hotel_data and 'grossPrice' in hotel_data['priceBreakdown'] else 'N/A'
-                    original_price = hotel_data['priceBreakdown']['strikethroughPrice']['amountRounded'] if 'strikethroughPrice' in hotel_data.get('priceBreakdown', {}) else ''
-                    hotel = {
-                        'id': hotel_data.get('basicPropertyData', {}).get('id'),
-                        'name': hotel_data.get('basicPropertyData', {}).get('name', 'Unknown Hotel'),
-
-                        'price': hotel_data.get('priceDisplayInfo', {}).get('displayPrice', {}).get('amountPerStay', {}).get('amountRounded', 'N/A'),
-                        'original_price': hotel_data.get('priceDisplayInfo', {}).get('priceBeforeDiscount', {}).get('amountPerStay', {}).get('amountRounded', ''),
-
-                        'review_score': hotel_data.get('basicPropertyData', {}).get('reviews', {}).get('totalScore', 0),
-                        'review_count': hotel_data.get('basicPropertyData', {}).get('reviews', {}).get('reviewsCount', 0),
-                        'review_word': hotel_data.get('basicPropertyData', {}).get('reviews', {}).get('totalScoreTextTag', {}).get('translation', 'No reviews'),
-
-                        'photo_url': hotel_data.get('basicPropertyData', {}).get('photos', {}).get('main', {}).get('lowResJpegUrl', {}).get('absoluteUrl', ''),
-
-                        'address': hotel_data.get('basicPropertyData', {}).get('location', {}).get('address', ''),
-                        
-                        'checkin_date': hotel_data.get('recommendedDate', {}).get('checkin', ''),
-                        'checkout_date': hotel_data.get('recommendedDate', {}).get('checkout', ''),
-                        
-                        'checkin_time': hotel_data.get('checkinCheckoutPolicy', {}).get('checkinTimeFromFormatted', ''),
-                        'checkout_time': hotel_data.get('checkinCheckoutPolicy', {}).get('checkoutTimeUntilFormatted', ''),
-                        
-                        'property_class': hotel_data.get('basicPropertyData', {}).get('starRating', {}).get('value', 0),
-                        'longitude': hotel_data.get('basicPropertyData', {}).get('location', {}).get('longitude'),
-                        'latitude': hotel_data.get('basicPropertyData', {}).get('location', {}).get('latitude'),
-                    }
-                    hotels.append(hotel)
-                except Exception as e:
-                    
-                    print(f"Error processing hotel at index {index}: {str(e)}")
-            return hotels[:15]  # Return first 15 hotels
-        else:
-            st.error(f"API Error: {response.status_code}")
-            return []
-            
+        # Results are cached per geohash tile, so overlapping searches only
+        # fetch the tiles no earlier search has covered
+        box = (lat - HOTEL_SEARCH_RADIUS_DEG, lon - HOTEL_SEARCH_RADIUS_DEG,
+               lat + HOTEL_SEARCH_RADIUS_DEG, lon + HOTEL_SEARCH_RADIUS_DEG)
+        precision = HOTEL_TILE_PRECISION or geohash.precision_for(2 * HOTEL_SEARCH_RADIUS_DEG, 2 * HOTEL_SEARCH_RADIUS_DEG)
+        tiles = geohash.covering(*box, precision)
+        tasks = {tile: (lambda tile=tile: fetch_tile(tile, checkin, checkout, guests)) for tile in tiles}
+        results, timed_out, errors = fan_out(tasks, HOTEL_SEARCH_DEADLINE)
+        if not results and errors:
+            raise next(iter(errors.values()))
+        if timed_out or errors:
+            st.warning(f"{len(timed_out) + len(errors)} of {len(tiles)} map areas failed to load; showing partial results")
+
+        rows = assemble_tiles([results[tile] for tile in tiles if tile in results], box)
+        return HotelTable(rows, center=(lat, lon))
     except Exception as e:
-        #st.error(f"Search failed: {str(e)}")
+        st.error(f"API Error: {str(e)}")
         return []
 
+_SORT_OPTIONS = {
+    "Popularity": (None, False),
+    "Price: low to high": ("price", False),
+    "Price: high to low": ("price", True),
+    "Review score": ("review_score", True),
+    "Star class": ("property_class", True),
+    "Distance": ("distance_km", False),
+}
+
+_FILTER_WIDGETS = ("hotel_sort", "hotel_price", "hotel_score", "hotel_class", "hotel_distance")
+
+def _range_filter(table, column, label, key, step, scale=1.0):
+    """Slider over a column's range; only returns a filter once it is narrowed.
+
+    The slider shows values multiplied by scale (e.g. an FX rate) and the
+    returned range is converted back to the column's units.
+    """
+    bounds = table.bounds(column)
+    if bounds is None or bounds[0] == bounds[1]:
+        return None
+    shown = (bounds[0] * scale, bounds[1] * scale)
+    low, high = st.slider(label, shown[0], shown[1], shown, step=step, key=key)
+    return (low / scale, high / scale) if (low, high) != shown else None
+
+def refine_hotels(table):
+    """Sort/filter controls over the cached table; runs locally, never re-queries"""
+    # Same rate as the hotel cards, so the price slider matches the prices shown
+    (fx,), currency = localize_prices([1.0])
+    if st.session_state.get("hotel_price_currency") != currency:
+        st.session_state.pop("hotel_price", None)
+        st.session_state.hotel_price_currency = currency
+    with st.expander("🔎 Sort & filter", expanded=False):
+        sort_by, descending = _SORT_OPTIONS[st.selectbox("Sort by", list(_SORT_OPTIONS), key="hotel_sort")]
+        col1, col2 = st.columns(2)
+        with col1:
+            filters = {
+                "price": _range_filter(table, "price", f"Price ({currency})", "hotel_price", 1.0, scale=fx),
+                "review_score": _range_filter(table, "review_score", "Review score", "hotel_score", 0.1),
+            }
+        with col2:
+            filters["property_class"] = _range_filter(table, "property_class", "Star class", "hotel_class", 1.0)
+            filters["distance_km"] = _range_filter(table, "distance_km", "Distance (km)", "hotel_distance", 0.5)
+    ranges = {column: bounds for column, bounds in filters.items() if bounds is not None}
+    return table.select(ranges, sort_by=sort_by, descending=descending)
+
 def display_hotels(hotels):
     if not hotels:
         st.warning("No hotels found for your search criteria")
@@ -170,7 +213,12 @@ def display_hotels(hotels):
 
     st.markdown(f"### 🏨 Found {len(hotels)} hotels")
 
-    for hotel in hotels:
+    # Only the visible cards are rendered; the rest stay as compact records
+    shown = st.session_state.get("hotels_shown", HOTELS_PER_PAGE)
+    visible = hotels[:shown]
+    # Current and pre-discount prices of every visible card converted in one pass
+    values, currency = localize_prices([h.price for h in visible] + [h.original_price for h in visible])
+    for hotel, price, original in zip(visible, values[:len(visible)], values[len(visible):]):
         hotel_id = str(hotel['id'])
 
         col1, col2 = st.columns([1, 2])
@@ -184,8 +232,8 @@ def display_hotels(hotels):
         with col2:
             st.markdown(f"#### {hotel['name']}")
             st.markdown(f"⭐ **{hotel['review_score']}** — {hotel['review_word']} ({hotel['review_count']} reviews)")
-            original_price = f"<span style='text-decoration:line-through; color:#888;'>{hotel['original_price']}</span>" if hotel['original_price'] else ''
-            st.markdown(f"**💰 Price:** {hotel['price']} &nbsp; {original_price}", unsafe_allow_html=True)
+            original_price = f"<span style='text-decoration:line-through; color:#888;'>{format_amount(original, currency)}</span>" if not math.isnan(original) else ''
+            st.markdown(f"**💰 Price:** {format_amount(price, currency)} &nbsp; {original_price}", unsafe_allow_html=True)
             st.markdown(f"**🛎️ Stay Time:** {hotel['checkin_time']} - {hotel['checkout_time']}")
             st.markdown(f"**📍 Address:** {hotel['address']}")
 
@@ -199,6 +247,12 @@ def display_hotels(hotels):
 
         st.markdown("---")
 
+    if shown < len(hotels):
+        st.caption(f"Showing {shown} of {len(hotels)} hotels")
+        if st.button("⬇️ Show more hotels", key="more_hotels"):
+            st.session_state.hotels_shown = shown + HOTELS_PER_PAGE
+            st.rerun()
+
 
 def show_hotel_details(hotel):
     with st.expander(f"🏨 Complete Details: {hotel['name']}", expanded=True):
@@ -258,12 +312,19 @@ def hotel_tab():
         with st.spinner("Searching hotels..."):
             hotels = search_hotels(destination, checkin.strftime('%Y-%m-%d'), 
                                  checkout.strftime('%Y-%m-%d'), guests)
+            # Kept across reruns so refining, "Book Now" and "Show more" don't lose the results
+            st.session_state.hotel_results = hotels
+            st.session_state.hotels_shown = HOTELS_PER_PAGE
+            for key in _FILTER_WIDGETS:
+                st.session_state.pop(key, None)
             
             if hotels:
                 if 'user_id' in st.session_state:
                     store_hotel_search(st.session_state.user_id, destination, 
                                      checkin.strftime('%Y-%m-%d'), 
                                      checkout.strftime('%Y-%m-%d'), guests)
-                display_hotels(hotels)
             else:
                 st.write("[DEBUG] No hotels returned from search_hotels")
+
+    if st.session_state.get("hotel_results"):
+        display_hotels(refine_hotels(st.session_state.hotel_results))
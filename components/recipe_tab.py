@@ -1,30 +1,42 @@
 import os
-import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
 import html2text
 from groq import Groq
-from neo4j import GraphDatabase
 from components.ui_utils import modern_card
-from config import RAPIDAPI_KEY, GROQ_API_KEY, NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD
+from config import (
+    RAPIDAPI_KEY, GROQ_API_KEY, RESULTS_SLICE_SIZE, YELP_PAGE_SIZE,
+    MENU_PREFETCH_WORKERS, MENU_PREFETCH_RETRY
+)
+from services import http_client
+from services.graph_writer import register_event_type, enqueue
+from services.single_flight import SingleFlight
+from services.paginator import PageCursor
+from services.llm_cache import cached_completion
+from services.response_cache import get_cache
 from webbrowser import open as web
 from bs4 import BeautifulSoup
 
 # Initialize AI client
 groq = Groq(api_key=GROQ_API_KEY)
 
+register_event_type("restaurant_interaction", """
+    UNWIND $events AS e
+    MERGE (u:User {id: e.user_id})
+    MERGE (r:Restaurant {id: e.restaurant_id})
+    CREATE (u)-[:VIEWED {action: e.action, timestamp: datetime(e.ts)}]->(r)
+""")
+
+# Menu analyses are shared across sessions and warmed in the background
+_menu_cache = get_cache("menus")
+_menu_pool = ThreadPoolExecutor(max_workers=MENU_PREFETCH_WORKERS, thread_name_prefix="menu-prefetch")
+_menu_attempts = {}  # cache key -> time of the last prefetch submitted
+_menu_lock = threading.Lock()
+
 def store_restaurant_interaction(user_id, restaurant_id, action):
-    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
-    try:
-        with driver.session() as session:
-            session.run("""
-                MERGE (u:User {id: $user_id})
-                MERGE (r:Restaurant {id: $restaurant_id})
-                CREATE (u)-[:VIEWED {action: $action, timestamp: datetime()}]->(r)
-            """, user_id=user_id, restaurant_id=restaurant_id, action=action)
-    except Exception as e:
-        st.error(f"Failed to save interaction: {e}")
-    finally:
-        driver.close()
+    enqueue("restaurant_interaction", user_id=user_id, restaurant_id=restaurant_id, action=action)
 
 def restaurant_tab():
     st.header("🍽️ Restaurant Finder & Menu Assistant")
@@ -38,7 +50,11 @@ def restaurant_tab():
 
     if st.button("Find Restaurants"):
         with st.spinner("Searching..."):
-            restaurants = search_restaurants(city, cuisine)
+            try:
+                restaurants = search_restaurants(city, cuisine)
+            except Exception as e:
+                st.error(f"Restaurant search error: {str(e)}")
+                restaurants = []
             st.session_state.restaurants = restaurants
             # Clear previous menu displays when searching new restaurants
             st.session_state.menu_displays = {}
@@ -52,7 +68,33 @@ def restaurant_tab():
     if hasattr(st.session_state, 'restaurants') and st.session_state.restaurants:
         display_restaurants(st.session_state.restaurants)
 
+        cursor = st.session_state.get("restaurant_cursor")
+        if cursor is not None and cursor.has_more:
+            if st.button("⬇️ More restaurants"):
+                try:
+                    st.session_state.restaurants.extend(cursor.take(RESULTS_SLICE_SIZE))
+                except Exception as e:
+                    st.error(f"Restaurant search error: {str(e)}")
+                st.rerun()
+
+_restaurant_flight = SingleFlight()
+
+def restaurant_cursor(location, cuisine=""):
+    # Identical page requests from concurrent sessions share one Yelp request
+    key = (" ".join(location.lower().split()), " ".join(cuisine.lower().split()))
+    return PageCursor(
+        lambda page: _restaurant_flight.do(key + (page,), fetch_restaurants, location, cuisine, page * YELP_PAGE_SIZE),
+        page_size=YELP_PAGE_SIZE,
+        first_page=0,
+        key=lambda r: r.get("id") or r.get("name"))
+
 def search_restaurants(location, cuisine=""):
+    """First slice of results; the cursor is kept in session state for more"""
+    cursor = restaurant_cursor(location, cuisine)
+    st.session_state.restaurant_cursor = cursor
+    return cursor.take(RESULTS_SLICE_SIZE)
+
+def fetch_restaurants(location, cuisine="", offset=0):
     url = "https://yelp-business-api.p.rapidapi.com/search/category"
     headers = {
         "X-RapidAPI-Key": RAPIDAPI_KEY,
@@ -61,17 +103,52 @@ def search_restaurants(location, cuisine=""):
     params = {
         "location": location,
         "search_category": "restaurants",
-        "limit": "5",
-        "offset": "0",
+        "limit": str(YELP_PAGE_SIZE),
+        "offset": str(offset),
         "business_details_type": "basic"
     }
     if cuisine:
         params["search_term"] = cuisine
 
-    resp = requests.get(url, headers=headers, params=params)
-    return resp.json().get("business_search_result", []) if resp.status_code == 200 else []
+    resp = http_client.get(url, headers=headers, params=params)
+    # Errors raise so the cursor reports them instead of ending as "no more results"
+    resp.raise_for_status()
+    return resp.json().get("business_search_result", [])
+
+def _menu_params(r, i):
+    return {"restaurant": r.get("id", f"restaurant_{i}"), "name": r.get("name", ""), "url": r.get("url", "")}
+
+def _menu_ok(summary):
+    # Error and "not found" messages are shown but not cached
+    return bool(summary) and not summary.startswith(("⚠️", "❌"))
+
+def menu_analysis(r, i=0):
+    """Menu summary for a restaurant; a prefetch already in flight is joined, not repeated"""
+    params = _menu_params(r, i)
+    return _menu_cache.get_or_fetch(
+        params, lambda: analyze_menu_with_groq(params["name"], params["url"]), should_cache=_menu_ok
+    )
+
+def prefetch_menus(restaurants):
+    """Start menu analysis for every listed restaurant on the bounded prefetch pool"""
+    now = time.time()
+    for i, r in enumerate(restaurants):
+        key = _menu_cache.make_key(_menu_params(r, i))
+        with _menu_lock:
+            # Reruns re-render the list; each restaurant is submitted once (failures retry later)
+            if now - _menu_attempts.get(key, 0) < MENU_PREFETCH_RETRY:
+                continue
+            _menu_attempts[key] = now
+        _menu_pool.submit(_prefetch_menu, r, i)
+
+def _prefetch_menu(r, i):
+    try:
+        menu_analysis(r, i)
+    except Exception as e:
+        print(f"Menu prefetch failed for {r.get('name', '')}: {e}")
 
 def display_restaurants(restaurants):
+    prefetch_menus(restaurants)
     for i, r in enumerate(restaurants):
         rid = r.get("id", f"restaurant_{i}")
         
@@ -110,14 +187,11 @@ def display_restaurants(restaurants):
                 with st.container():
                     st.markdown("#### Menu Summary")
                     
-                    # Check if we already have the menu analysis cached
-                    menu_cache_key = f"menu_analysis_{rid}"
-                    if menu_cache_key not in st.session_state:
-                        with st.spinner("Fetching menu analysis..."):
-                            summary = analyze_menu_with_groq(r.get("name", ""), r.get("url", ""))
-                            st.session_state[menu_cache_key] = summary
+                    # Usually already prefetched; otherwise wait for (or start) the analysis
+                    with st.spinner("Fetching menu analysis..."):
+                        summary = menu_analysis(r, i)
                     
-                    st.write(st.session_state[menu_cache_key])
+                    st.write(summary)
                     
                     # Add a button to hide the menu
                     hide_button_key = f"hide_menu_{rid}"
@@ -136,13 +210,14 @@ def get_duckduckgo_menu_url(restaurant_name):
     }
 
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
+        resp = http_client.get(url, headers=headers, timeout=10)
         soup = BeautifulSoup(resp.text, "html.parser")
         results = soup.find_all("a", class_="result__a", href=True)
         if results:
             return results[0]["href"]
     except Exception as e:
-        st.error(f"Error searching for menu: {e}")
+        # Runs on the prefetch pool, where st.* calls are not rendered
+        print(f"Error searching for menu: {e}")
         return None
 
     return None
@@ -154,7 +229,7 @@ def analyze_menu_by_name(restaurant_name):
         return "⚠️ Could not find a menu link online for this restaurant."
 
     try:
-        response = requests.get(menu_url, timeout=10)
+        response = http_client.get(menu_url, timeout=10)
         response.raise_for_status()
 
         md = html2text.HTML2Text()
@@ -162,7 +237,8 @@ def analyze_menu_by_name(restaurant_name):
         md.ignore_images = True
         menu_md = md.handle(response.text)[:8000]
 
-        ai_resp = groq.chat.completions.create(
+        summary = cached_completion(
+            groq,
             messages=[
                 {
                     "role": "system", 
@@ -177,7 +253,7 @@ def analyze_menu_by_name(restaurant_name):
             temperature=0.7,
             max_tokens=500
         )
-        return ai_resp.choices[0].message.content + f"\n\n[View Source]({menu_url})"
+        return summary + f"\n\n[View Source]({menu_url})"
 
     except Exception as e:
         return f"❌ Error analyzing menu: {e}"
@@ -187,7 +263,7 @@ def analyze_menu_with_groq(name, url):
     # First try the restaurant's own website
     if url:
         try:
-            resp = requests.get(url, timeout=10)
+            resp = http_client.get(url, timeout=10)
             resp.raise_for_status()
             
             md_converter = html2text.HTML2Text()
@@ -197,7 +273,8 @@ def analyze_menu_with_groq(name, url):
 
             # Check if the content looks like it might contain menu information
             if any(word in menu_md.lower() for word in ['menu', 'appetizer', 'entree', 'dessert', 'pizza', 'burger', 'salad', 'soup', 'price', '$']):
-                ai_resp = groq.chat.completions.create(
+                summary = cached_completion(
+                    groq,
                     messages=[
                         {
                             "role": "system",
@@ -212,7 +289,7 @@ def analyze_menu_with_groq(name, url):
                     temperature=0.7,
                     max_tokens=500
                 )
-                return ai_resp.choices[0].message.content + f"\n\n[View Source]({url})"
+                return summary + f"\n\n[View Source]({url})"
         except Exception:
             pass  # Fall back to DuckDuckGo search
 
@@ -1,12 +1,23 @@
 # Shopping functionality with voice interaction and fixed cart
 import streamlit as st
 # import streamlit.components.v1  # Not directly used, can be removed
-import requests
 import locale
+import numpy as np
 import pycountry
-from neo4j import GraphDatabase
-from components.ui_utils import modern_card
-from config import RAPIDAPI_KEY, NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD
+from components.ui_utils import modern_card, localize_prices
+from config import (
+    RAPIDAPI_KEY, RECOMMENDED_SEARCHES_TTL, PRODUCT_SEARCH_DEADLINE, HTTP_CONNECT_TIMEOUT,
+    RESULTS_SLICE_SIZE, ALIEXPRESS_PAGE_SIZE
+)
+from services import http_client
+from services.fanout import fan_out
+from services.paginator import PageCursor
+from services.fx_rates import format_amount
+from services.intent_router import router as intent_router, SHOPPING_INTENTS
+from services.response_cache import get_cache
+from services.neo4j_pool import get_session
+from services.graph_writer import register_event_type, enqueue, add_flush_listener
+from services.ttl_cache import TTLCache
 # import json  # Not directly used, can be removed
 import uuid
 try:
@@ -29,6 +40,8 @@ def init_session_state():
         st.session_state.checkout_stage = None
     if "current_products" not in st.session_state:
         st.session_state.current_products = {'ebay': [], 'aliexpress': []}
+    if "product_cursors" not in st.session_state:
+        st.session_state.product_cursors = {}
     if "last_search_query" not in st.session_state:
         st.session_state.last_search_query = ""
     if "cart_updated" not in st.session_state:
@@ -38,45 +51,52 @@ def init_session_state():
     if "audio_response" not in st.session_state:
         st.session_state.audio_response = None
 
-# Initialize Neo4j driver
-def get_driver():
-    return GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
+# Store search in Neo4j (batched by the background graph writer)
+register_event_type("product_search", """
+UNWIND $events AS e
+MERGE (u:User {id: e.user_id})
+MERGE (p:ProductCategory {name: toLower(e.query)})
+CREATE (s:Search {
+    type: 'shopping',
+    query: e.query,
+    platform: e.platform,
+    results_count: e.results_count,
+    timestamp: datetime(e.ts)
+})
+CREATE (u)-[:SEARCHED]->(s)
+CREATE (s)-[:FOR]->(p)
+FOREACH (ignore IN CASE WHEN e.results_count > 0 THEN [1] ELSE [] END |
+    MERGE (pop:PopularProduct {query: toLower(e.query)})
+    SET pop.last_searched = datetime(e.ts)
+    SET pop.search_count = COALESCE(pop.search_count, 0) + 1
+    MERGE (s)-[:RELATED_TO]->(pop)
+)
+""")
 
-# Store search in Neo4j
 def store_product_search(user_id, query, platform, results_count):
-    driver = get_driver()
-    try:
-        with driver.session() as session:
-            session.run("""
-            MERGE (u:User {id: $user_id})
-            MERGE (p:ProductCategory {name: toLower($query)})
-            CREATE (s:Search {
-                type: 'shopping',
-                query: $query,
-                platform: $platform,
-                results_count: $results_count,
-                timestamp: datetime()
-            })
-            CREATE (u)-[:SEARCHED]->(s)
-            CREATE (s)-[:FOR]->(p)
-            FOREACH (ignore IN CASE WHEN $results_count > 0 THEN [1] ELSE [] END |
-                MERGE (pop:PopularProduct {query: toLower($query)})
-                SET pop.last_searched = datetime()
-                SET pop.search_count = COALESCE(pop.search_count, 0) + 1
-                MERGE (s)-[:RELATED_TO]->(pop)
-            )
-            """, 
-            user_id=user_id, query=query, platform=platform, results_count=results_count)
-    except Exception as e:
-        st.error(f"Failed to save search: {str(e)}")
-    finally:
-        driver.close()
+    if not enqueue("product_search", user_id=user_id, query=query,
+                   platform=platform, results_count=results_count):
+        st.warning("Search history is busy; this search was not saved")
+
+# Per-user recommended searches, dropped as soon as a new search for that user is committed
+_recommended_cache = TTLCache(maxsize=2048, ttl=RECOMMENDED_SEARCHES_TTL)
+
+def _invalidate_recommended_searches(event_type, events):
+    if event_type == "product_search":
+        for e in events:
+            _recommended_cache.invalidate(e["user_id"])
 
-# Get recommended searches from Neo4j
+add_flush_listener(_invalidate_recommended_searches)
+
+# Get recommended searches from Neo4j (cached per user)
 def get_recommended_searches(user_id):
-    driver = get_driver()
+    cached = _recommended_cache.get(user_id)
+    if cached is not None:
+        return cached
+    # Taken before the query: if a flush invalidates the user meanwhile, the result isn't cached
+    generation = _recommended_cache.generation(user_id)
     try:
-        with driver.session() as session:
+        with get_session() as session:
             result = session.run("""
             MATCH (u:User {id: $user_id})-[:SEARCHED]->(s:Search)-[:FOR]->(p:ProductCategory)
             OPTIONAL MATCH (p)<-[:FOR]-(other:Search)-[:RELATED_TO]->(pop:PopularProduct)
@@ -86,12 +106,12 @@ def get_recommended_searches(user_id):
             ORDER BY search_count DESC
             LIMIT 5
             """, user_id=user_id)
-            return [dict(record) for record in result]
+            recommended = [dict(record) for record in result]
+        _recommended_cache.set(user_id, recommended, generation=generation)
+        return recommended
     except Exception as e:
         st.error(f"Failed to get recommendations: {str(e)}")
         return []
-    finally:
-        driver.close()
 
 # Detect user's country using locale
 def detect_country():
@@ -103,84 +123,126 @@ def detect_country():
         pass
     return "US"
 
-# Search products function
-def search_products(query, platform, country):
-    products = {'ebay': [], 'aliexpress': []}
+_product_cache = get_cache("products")
 
-    if platform in ["eBay", "Both"]:
-        try:
-            url = f"https://ebay-search-result.p.rapidapi.com/search/{query}"
-            headers = {
-                "X-RapidAPI-Key": RAPIDAPI_KEY,
-                "X-RapidAPI-Host": "ebay-search-result.p.rapidapi.com"
-            }
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
-                products['ebay'] = response.json().get('results', [])[:5]
-        except Exception as e:
-            st.error(f"eBay search error: {str(e)}")
+# Provider calls (run on the fan-out pool, so they raise instead of using st.*)
+def fetch_ebay_products(query, page=1):
+    url = f"https://ebay-search-result.p.rapidapi.com/search/{query}"
+    headers = {
+        "X-RapidAPI-Key": RAPIDAPI_KEY,
+        "X-RapidAPI-Host": "ebay-search-result.p.rapidapi.com"
+    }
+    params = {"page": page} if page > 1 else None
+    response = http_client.get(url, headers=headers, params=params, timeout=(HTTP_CONNECT_TIMEOUT, PRODUCT_SEARCH_DEADLINE))
+    response.raise_for_status()
+    return response.json().get('results', [])
 
+def fetch_aliexpress_products(query, country, page=1):
+    url = "https://aliexpress-business-api.p.rapidapi.com/textsearch.php"
+    headers = {
+        "X-RapidAPI-Key": RAPIDAPI_KEY,
+        "X-RapidAPI-Host": "aliexpress-business-api.p.rapidapi.com"
+    }
+    params = {
+        "keyWord": query,
+        "pageSize": str(ALIEXPRESS_PAGE_SIZE),
+        "pageIndex": str(page),
+        "country": country,
+        "currency": "USD",
+        "lang": "en",
+        "filter": "orders",
+        "sortBy": "asc"
+    }
+    response = http_client.get(url, headers=headers, params=params, timeout=(HTTP_CONNECT_TIMEOUT, PRODUCT_SEARCH_DEADLINE))
+    response.raise_for_status()
+    return response.json().get('result', {}).get('resultList', [])
+
+# Result cursors: every page goes through the response cache, and the page
+# after the visible slice is prefetched so "more results" is served locally
+def ebay_cursor(query):
+    return PageCursor(
+        lambda page: _product_cache.get_or_fetch(
+            {"provider": "ebay", "query": query, "page": page},
+            lambda: fetch_ebay_products(query, page)),
+        key=lambda product: product.get('itemUrl') or product.get('title'))
+
+def aliexpress_cursor(query, country):
+    return PageCursor(
+        lambda page: _product_cache.get_or_fetch(
+            {"provider": "aliexpress", "query": query, "country": country, "page": page},
+            lambda: fetch_aliexpress_products(query, country, page)),
+        page_size=ALIEXPRESS_PAGE_SIZE,
+        key=lambda product: product.get('itemUrl') or product.get('title'))
+
+_platform_labels = {'ebay': "eBay", 'aliexpress': "AliExpress"}
+
+# Search products function: platforms are queried concurrently under one deadline
+def search_products(query, platform, country):
+    cursors = {}
+    if platform in ["eBay", "Both"]:
+        cursors['ebay'] = ebay_cursor(query)
     if platform in ["AliExpress", "Both"]:
-        try:
-            url = "https://aliexpress-business-api.p.rapidapi.com/textsearch.php"
-            headers = {
-                "X-RapidAPI-Key": RAPIDAPI_KEY,
-                "X-RapidAPI-Host": "aliexpress-business-api.p.rapidapi.com"
-            }
-            params = {
-                "keyWord": query,
-                "pageSize": "20",
-                "pageIndex": "1",
-                "country": country,
-                "currency": "USD",
-                "lang": "en",
-                "filter": "orders",
-                "sortBy": "asc"
-            }
-            response = requests.get(url, headers=headers, params=params)
-            if response.status_code == 200:
-                products['aliexpress'] = response.json().get('result', {}).get('resultList', [])[:5]
-        except Exception as e:
-            st.error(f"AliExpress search error: {str(e)}")
-
-    return products
+        cursors['aliexpress'] = aliexpress_cursor(query, country)
+    st.session_state.product_cursors = cursors
+
+    tasks = {name: (lambda cursor=cursor: cursor.take(RESULTS_SLICE_SIZE)) for name, cursor in cursors.items()}
+    results, timed_out, errors = fan_out(tasks, PRODUCT_SEARCH_DEADLINE)
+
+    for name, e in errors.items():
+        st.error(f"{_platform_labels[name]} search error: {str(e)}")
+    if timed_out:
+        st.warning(f"{', '.join(_platform_labels[name] for name in timed_out)} took too long; showing partial results")
+        # The late slice is discarded, so that cursor can't continue from it
+        for name in timed_out:
+            cursors.pop(name)
+
+    return {
+        'ebay': results.get('ebay', []),
+        'aliexpress': results.get('aliexpress', []),
+        'timed_out': timed_out
+    }
+
+def load_more_products(name):
+    """Append the next slice from the platform's cursor to the current results"""
+    cursor = st.session_state.product_cursors.get(name)
+    if cursor is None:
+        return
+    try:
+        st.session_state.current_products[name].extend(cursor.take(RESULTS_SLICE_SIZE))
+    except Exception as e:
+        st.error(f"{_platform_labels[name]} search error: {str(e)}")
+
+def more_results_button(name):
+    cursor = st.session_state.get("product_cursors", {}).get(name)
+    if cursor is not None and cursor.has_more:
+        if st.button(f"⬇️ More {_platform_labels[name]} results", key=f"more_{name}"):
+            load_more_products(name)
+            st.rerun()
 
 # Voice input processing
 def process_voice_input(text):
     """Process voice input and return appropriate response"""
-    text_lower = text.lower()
+    # No LLM behind this tab, so a low-confidence local guess ("search for X") still beats the help text
+    match = intent_router.route(text, SHOPPING_INTENTS) or intent_router.classify(text, SHOPPING_INTENTS)
+    intent = match.intent if match else None
     
-    # Shopping commands
-    if any(word in text_lower for word in ["buy", "shop", "search", "find"]):
-        if "backpack" in text_lower:
-            query = "travel backpack"
-        elif "adapter" in text_lower or "charger" in text_lower:
-            query = "travel power adapter"
-        elif "suitcase" in text_lower or "luggage" in text_lower:
-            query = "carry-on suitcase"
-        elif "headphones" in text_lower:
-            query = "travel headphones"
-        elif "camera" in text_lower:
-            query = "travel camera"
-        else:
-            # Extract product name from voice input
-            query = text_lower.replace("buy", "").replace("shop for", "").replace("search for", "").replace("find", "").strip()
-        
+    # Shopping commands (a bare "buy" has nothing to search for)
+    if intent == "shopping" and match.parameters.get("query"):
+        query = match.parameters["query"]
         st.session_state.shopping_query = query
         st.session_state.platform_select = "Both"
-        return f"I'll search for {query} for you!"
+        return match.response
     
     # Cart commands
-    elif "cart" in text_lower:
-        if "view" in text_lower or "show" in text_lower or "check" in text_lower:
-            st.session_state.checkout_stage = "cart"
-            return f"Here's your cart with {len(st.session_state.cart)} items"
-        elif "clear" in text_lower or "empty" in text_lower:
-            st.session_state.cart.clear()
-            return "Your cart has been cleared"
+    elif intent == "cart_view":
+        st.session_state.checkout_stage = "cart"
+        return f"Here's your cart with {len(st.session_state.cart)} items"
+    elif intent == "cart_clear":
+        st.session_state.cart.clear()
+        return "Your cart has been cleared"
     
     # Checkout commands
-    elif "checkout" in text_lower or "order" in text_lower:
+    elif intent == "checkout":
         if st.session_state.cart:
             st.session_state.checkout_stage = "checkout"
             return "Let's proceed to checkout"
@@ -387,9 +449,8 @@ def shopping_tab(voice_input=None):
         st.subheader("🛍️ Cart Status")
         if st.session_state.cart:
             st.write(f"Items in cart: {len(st.session_state.cart)}")
-            total_price = sum(float(item['price']) if str(item['price']).replace('.', '', 1).isdigit() else 0 
-                            for item in st.session_state.cart)
-            st.write(f"Total: ${total_price:.2f}")
+            values, currency = cart_prices()
+            st.write(f"Total: {format_amount(np.nansum(values), currency)}")
         else:
             st.write("Cart is empty")
         
@@ -477,11 +538,20 @@ def shopping_tab(voice_input=None):
     elif st.session_state.checkout_stage == "checkout":
         checkout_tab()
 
+def _listed_price(product):
+    price = product.get('price', {})
+    return price.get('value') if isinstance(price, dict) else price
+
+def cart_prices():
+    """Cart item prices (stored in USD) in the display currency, converted in one pass"""
+    return localize_prices([item['price'] for item in st.session_state.cart])
+
 def display_products(products, platform):
     """Display products with improved UI and working cart functionality"""
     
     if platform in ["eBay", "Both"] and products['ebay']:
         st.subheader("💰 eBay Results")
+        local_prices, currency = localize_prices([_listed_price(p) for p in products['ebay']])
         for idx, product in enumerate(products['ebay']):
             price = product.get('price', {})
             price_value = price.get('value', 'N/A') if isinstance(price, dict) else str(price) if price else 'N/A'
@@ -499,7 +569,7 @@ def display_products(products, platform):
                     modern_card(
                         title=title,
                         content=f"""
-                        **Price:** ${price_value}  
+                        **Price:** {format_amount(local_prices[idx], currency)}  
                         **Platform:** eBay  
                         [View Product]({url})
                         """,
@@ -524,9 +594,11 @@ def display_products(products, platform):
                             st.session_state.audio_response = audio_data
                         
                         st.rerun()
+        more_results_button('ebay')
 
     if platform in ["AliExpress", "Both"] and products['aliexpress']:
         st.subheader("🌏 AliExpress Results")
+        local_prices, currency = localize_prices([_listed_price(p) for p in products['aliexpress']])
         for idx, product in enumerate(products['aliexpress']):
             price = product.get('price', {})
             price_value = price.get('value', 'N/A') if isinstance(price, dict) else str(price) if price else 'N/A'
@@ -544,7 +616,7 @@ def display_products(products, platform):
                     modern_card(
                         title=title,
                         content=f"""
-                        **Price:** ${price_value}  
+                        **Price:** {format_amount(local_prices[idx], currency)}  
                         **Platform:** AliExpress  
                         [View Product]({url})
                         """,
@@ -569,6 +641,7 @@ def display_products(products, platform):
                             st.session_state.audio_response = audio_data
                         
                         st.rerun()
+        more_results_button('aliexpress')
 
 def view_cart_tab():
     """Display cart with improved UI"""
@@ -582,7 +655,7 @@ def view_cart_tab():
         return
 
     # Cart items
-    total = 0
+    values, currency = cart_prices()
     for i, item in enumerate(st.session_state.cart):
         with st.container():
             col1, col2, col3 = st.columns([3, 1, 1])
@@ -593,9 +666,7 @@ def view_cart_tab():
                 st.write(f"[View Product]({item['url']})")
             
             with col2:
-                price = float(item['price']) if str(item['price']).replace('.', '', 1).isdigit() else 0
-                st.write(f"**${price:.2f}**")
-                total += price
+                st.write(f"**{format_amount(values[i], currency)}**")
             
             with col3:
                 if st.button(f"🗑️ Remove", key=f"remove_{i}"):
@@ -606,7 +677,7 @@ def view_cart_tab():
         st.divider()
 
     # Cart summary
-    st.subheader(f"💰 Total: ${total:.2f}")
+    st.subheader(f"💰 Total: {format_amount(np.nansum(values), currency)}")
     
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -629,9 +700,9 @@ def checkout_tab():
     """Checkout process with voice feedback"""
     st.subheader("💳 Checkout")
     # Order summary
-    total = sum(float(item['price']) if str(item['price']).replace('.', '', 1).isdigit() else 0 
-                for item in st.session_state.cart)
-    st.write(f"**Order Summary:** {len(st.session_state.cart)} items - Total: ${total:.2f}")
+    values, currency = cart_prices()
+    total = format_amount(np.nansum(values), currency)
+    st.write(f"**Order Summary:** {len(st.session_state.cart)} items - Total: {total}")
     
     # Customer details
     with st.form("checkout_form"):
@@ -661,12 +732,12 @@ def checkout_tab():
                     **Order ID:** {order_id}  
                     **Customer:** {name}  
                     **Email:** {email}  
-                    **Total:** ${total:.2f}  
+                    **Total:** {total}  
                     **Items:** {len(st.session_state.cart)}
                     """)
                     
                     # Voice feedback
-                    st.session_state.voice_response = f"Order {order_id} placed successfully! Total amount ${total:.2f}"
+                    st.session_state.voice_response = f"Order {order_id} placed successfully! Total amount {total}"
                     
                     # Clear cart and reset
                     st.session_state.cart.clear()
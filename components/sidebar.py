@@ -1,6 +1,7 @@
 # Sidebar navigation
 import streamlit as st
-from config import THEME
+from config import THEME, DEFAULT_CURRENCY
+from services import fx_rates
 
 def create_sidebar():
     with st.sidebar:
@@ -43,6 +44,14 @@ def create_sidebar():
         
         st.markdown("---")
         
+        # Display currency (conversions use the shared rate table, no per-price calls)
+        codes = fx_rates.currencies()
+        if DEFAULT_CURRENCY not in codes:
+            codes = [DEFAULT_CURRENCY] + codes
+        st.selectbox("Currency", codes, index=codes.index(DEFAULT_CURRENCY), key="display_currency")
+        
+        st.markdown("---")
+        
         # User Profile
         st.subheader("Profile")
         if "user_name" not in st.session_state:
@@ -1,6 +1,7 @@
 # UI helper functions
 import streamlit as st
-from config import THEME
+from config import THEME, DEFAULT_CURRENCY, FX_BASE_CURRENCY
+from services import fx_rates
 
 print("ui_utils.py loaded")
 
@@ -90,4 +91,17 @@ def modern_card(title, content, icon=None):
         <h3>{icon_html}{title}</h3>
         {content}
     </div>
-    """, unsafe_allow_html=True)
\ No newline at end of file
+    """, unsafe_allow_html=True)
+
+def localize_prices(amounts, from_currency=FX_BASE_CURRENCY):
+    """Convert a result set's prices to the display currency in one pass.
+
+    Returns (values, currency); falls back to the source currency when no
+    rate table is available.
+    """
+    currency = st.session_state.get("display_currency", DEFAULT_CURRENCY)
+    try:
+        return fx_rates.convert(amounts, from_currency, currency), currency
+    except Exception as e:
+        st.caption(f"Prices shown in {from_currency} ({e})")
+        return fx_rates.convert(amounts, from_currency, from_currency), from_currency
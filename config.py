@@ -27,12 +27,153 @@ RAPIDAPI_KEY = get_secret("RAPIDAPI_KEY")
 LOCATIONIQ_API_KEY = get_secret("LOCATIONIQ_API_KEY")
 SPOONACULAR_KEY = get_secret("SPOONACULAR_API_KEY")
 FETCH_AI_API_KEY = get_secret("FETCH_AI_API_KEY")
+EXCHANGE_RATE_API_KEY = get_secret("EXCHANGE_RATE_API_KEY")
 
 # Neo4j Configuration
 NEO4J_URI = get_secret("NEO4J_URI")
 NEO4J_USERNAME = get_secret("NEO4J_USERNAME")
 NEO4J_PASSWORD = get_secret("NEO4J_PASSWORD")
 
+# Neo4j connection pool (shared by every tab, see services/neo4j_pool.py)
+NEO4J_MAX_POOL_SIZE = int(get_secret("NEO4J_MAX_POOL_SIZE", 20))
+NEO4J_ACQUISITION_TIMEOUT = float(get_secret("NEO4J_ACQUISITION_TIMEOUT", 10))
+NEO4J_LIVENESS_CHECK_TIMEOUT = float(get_secret("NEO4J_LIVENESS_CHECK_TIMEOUT", 30))
+NEO4J_MAX_CONNECTION_LIFETIME = float(get_secret("NEO4J_MAX_CONNECTION_LIFETIME", 3600))
+NEO4J_SCHEMA_RETRY_INTERVAL = float(get_secret("NEO4J_SCHEMA_RETRY_INTERVAL", 300))  # see services/graph_schema.py
+
+# Background graph writer (see services/graph_writer.py)
+GRAPH_WRITER_BATCH_SIZE = int(get_secret("GRAPH_WRITER_BATCH_SIZE", 100))
+GRAPH_WRITER_FLUSH_INTERVAL = float(get_secret("GRAPH_WRITER_FLUSH_INTERVAL", 2.0))
+GRAPH_WRITER_QUEUE_SIZE = int(get_secret("GRAPH_WRITER_QUEUE_SIZE", 5000))
+GRAPH_WRITER_ENQUEUE_TIMEOUT = float(get_secret("GRAPH_WRITER_ENQUEUE_TIMEOUT", 0.5))
+
+# Recommendation projections (see services/recommendation_store.py)
+RECOMMENDATION_REFRESH_INTERVAL = float(get_secret("RECOMMENDATION_REFRESH_INTERVAL", 15))
+RECOMMENDATION_MAX_AGE = float(get_secret("RECOMMENDATION_MAX_AGE", 900))
+RECOMMENDATION_ACTIVE_WINDOW = float(get_secret("RECOMMENDATION_ACTIVE_WINDOW", 3600))
+RECOMMENDED_SEARCHES_TTL = float(get_secret("RECOMMENDED_SEARCHES_TTL", 600))
+
+# Shared HTTP client (see services/http_client.py)
+HTTP_CONNECT_TIMEOUT = float(get_secret("HTTP_CONNECT_TIMEOUT", 3.05))
+HTTP_READ_TIMEOUT = float(get_secret("HTTP_READ_TIMEOUT", 20))
+HTTP_POOL_MAXSIZE = int(get_secret("HTTP_POOL_MAXSIZE", 20))
+HTTP_GET_RETRIES = int(get_secret("HTTP_GET_RETRIES", 2))
+HTTP_BACKOFF_BASE = float(get_secret("HTTP_BACKOFF_BASE", 0.3))
+HTTP_BACKOFF_MAX = float(get_secret("HTTP_BACKOFF_MAX", 4))
+
+# Rate limiting and RapidAPI quota (see services/rate_limiter.py)
+# host -> (requests per second, burst); other *.rapidapi.com hosts use RAPIDAPI_RATE_LIMIT
+RATE_LIMITS = {
+    "nominatim.openstreetmap.org": (1.0, 1),
+    "us1.locationiq.com": (2.0, 2),
+}
+RAPIDAPI_RATE_LIMIT = (
+    float(get_secret("RAPIDAPI_RATE_PER_SEC", 5)),
+    int(get_secret("RAPIDAPI_BURST", 10))
+)
+RATE_LIMIT_MAX_WAIT = float(get_secret("RATE_LIMIT_MAX_WAIT", 5))
+RAPIDAPI_QUOTA_RESERVE = int(get_secret("RAPIDAPI_QUOTA_RESERVE", 25))
+
+# Circuit breakers (see services/circuit_breaker.py)
+CIRCUIT_FAILURE_RATE = float(get_secret("CIRCUIT_FAILURE_RATE", 0.5))
+CIRCUIT_MIN_CALLS = int(get_secret("CIRCUIT_MIN_CALLS", 5))
+CIRCUIT_WINDOW = int(get_secret("CIRCUIT_WINDOW", 20))
+CIRCUIT_RESET_TIMEOUT = float(get_secret("CIRCUIT_RESET_TIMEOUT", 30))
+CIRCUIT_HALF_OPEN_PROBES = int(get_secret("CIRCUIT_HALF_OPEN_PROBES", 1))
+CIRCUIT_SLOW_CALL_SECONDS = float(get_secret("CIRCUIT_SLOW_CALL_SECONDS", 10))
+# Non-RapidAPI provider hosts that also get a breaker
+CIRCUIT_BREAKER_HOSTS = {
+    "us1.locationiq.com",
+    "nominatim.openstreetmap.org",
+    "restcountries.com",
+    "v6.exchangerate-api.com",
+}
+
+# Geocoding cache (see services/geocode_cache.py)
+GEOCODE_CACHE_PATH = get_secret("GEOCODE_CACHE_PATH", os.path.join(".cache", "geocode.sqlite3"))
+GEOCODE_TTL = float(get_secret("GEOCODE_TTL", 90 * 24 * 3600))
+GEOCODE_NEGATIVE_TTL = float(get_secret("GEOCODE_NEGATIVE_TTL", 24 * 3600))
+GEOCODE_MEMORY_SIZE = int(get_secret("GEOCODE_MEMORY_SIZE", 4096))
+GEOCODE_WARM_FILE = get_secret("GEOCODE_WARM_FILE")
+
+# Offline airport index (see services/airport_index.py)
+AIRPORTS_DATA_PATH = get_secret("AIRPORTS_DATA_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "airports.csv"))
+AIRPORT_INDEX_DIR = get_secret("AIRPORT_INDEX_DIR", os.path.join(".cache", "airport_index"))
+AIRPORT_SEARCH_RADIUS_KM = float(get_secret("AIRPORT_SEARCH_RADIUS_KM", 100))
+PLACE_RESOLUTION_TTL = float(get_secret("PLACE_RESOLUTION_TTL", 24 * 3600))
+
+# Exchange rates (see services/fx_rates.py); provider prices are requested in the base currency
+FX_BASE_CURRENCY = "USD"
+FX_RATES_PATH = get_secret("FX_RATES_PATH", os.path.join(".cache", "fx_rates.json"))
+FX_REFRESH_INTERVAL = float(get_secret("FX_REFRESH_INTERVAL", 6 * 3600))
+FX_RETRY_INTERVAL = float(get_secret("FX_RETRY_INTERVAL", 300))
+
+# Flexible-date fare calendar (see components/flight_tab.py)
+FARE_CALENDAR_DEFAULT_DAYS = int(get_secret("FARE_CALENDAR_DEFAULT_DAYS", 3))
+FARE_CALENDAR_MAX_DAYS = int(get_secret("FARE_CALENDAR_MAX_DAYS", 7))
+FARE_CALENDAR_DEADLINE = float(get_secret("FARE_CALENDAR_DEADLINE", 20))
+
+# Concurrent provider fan-out (see services/fanout.py)
+FANOUT_MAX_WORKERS = int(get_secret("FANOUT_MAX_WORKERS", 16))
+PRODUCT_SEARCH_DEADLINE = float(get_secret("PRODUCT_SEARCH_DEADLINE", 8))
+
+# Hotel search (see components/hotel_tab.py)
+HOTELS_PER_PAGE = int(get_secret("HOTELS_PER_PAGE", 20))  # cards rendered per "Show more" step
+HOTEL_SEARCH_RADIUS_DEG = float(get_secret("HOTEL_SEARCH_RADIUS_DEG", 0.5))
+# Geohash length of cached tiles; 0 derives it from the search box (geohash.precision_for).
+# Trade-off: a cold search costs up to 4 provider calls (about 2.9 on average for the default
+# 1 degree box, each over a ~1.4 degree tile clipped to the box) instead of one, and in return
+# any later search overlapping those tiles is served from cache. A smaller radius gives
+# smaller tiles; a finer fixed precision multiplies the calls (about 26 at precision 4).
+HOTEL_TILE_PRECISION = int(get_secret("HOTEL_TILE_PRECISION", 0))
+HOTEL_SEARCH_DEADLINE = float(get_secret("HOTEL_SEARCH_DEADLINE", 30))
+
+# LLM response cache (see services/llm_cache.py)
+LLM_CACHE_BACKEND = get_secret("LLM_CACHE_BACKEND", "disk")  # "memory" or "disk"
+LLM_CACHE_PATH = get_secret("LLM_CACHE_PATH", os.path.join(".cache", "llm.sqlite3"))
+LLM_CACHE_TTL = float(get_secret("LLM_CACHE_TTL", 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(get_secret("LLM_CACHE_MAX_ENTRIES", 5000))
+LLM_SEMANTIC_CACHE = str(get_secret("LLM_SEMANTIC_CACHE", "true")).lower() == "true"
+LLM_SEMANTIC_THRESHOLD = float(get_secret("LLM_SEMANTIC_THRESHOLD", 0.92))
+LLM_SEMANTIC_INDEX_SIZE = int(get_secret("LLM_SEMANTIC_INDEX_SIZE", 2000))
+LLM_SEMANTIC_INDEX_PATH = get_secret("LLM_SEMANTIC_INDEX_PATH", os.path.join(".cache", "llm_semantic.npz"))
+
+# Chat streaming: render tokens as they arrive and speak each finished sentence
+CHAT_STREAMING = str(get_secret("CHAT_STREAMING", "true")).lower() == "true"
+TTS_BITRATE = 32000  # gTTS MP3 bitrate (bits/s), used to schedule sentence clips back to back
+
+# Chat context window (see services/chat_context.py)
+CHAT_CONTEXT_MAX_TOKENS = int(get_secret("CHAT_CONTEXT_MAX_TOKENS", 3000))  # prompt cap, below the model window
+CHAT_CONTEXT_REPLY_TOKENS = 1024  # reserved for the reply
+CHAT_CONTEXT_KEEP_RATIO = 0.5  # after folding, recent turns fill at most this share of the budget
+CHAT_SUMMARY_MAX_TOKENS = 300
+CHAT_SUMMARY_MODEL = get_secret("CHAT_SUMMARY_MODEL", "llama3-8b-8192")
+
+# Local intent router (see services/intent_router.py); below this the LLM classifies
+INTENT_ROUTER_MIN_CONFIDENCE = float(get_secret("INTENT_ROUTER_MIN_CONFIDENCE", 0.75))
+
+# Paginated results (see services/paginator.py)
+RESULTS_SLICE_SIZE = int(get_secret("RESULTS_SLICE_SIZE", 5))
+ALIEXPRESS_PAGE_SIZE = int(get_secret("ALIEXPRESS_PAGE_SIZE", 20))
+YELP_PAGE_SIZE = int(get_secret("YELP_PAGE_SIZE", 10))
+PAGINATION_PREFETCH_WORKERS = int(get_secret("PAGINATION_PREFETCH_WORKERS", 4))
+
+# Provider response cache (see services/response_cache.py)
+RESPONSE_CACHE_BACKEND = get_secret("RESPONSE_CACHE_BACKEND", "memory")  # "memory" or "disk"
+RESPONSE_CACHE_PATH = get_secret("RESPONSE_CACHE_PATH", os.path.join(".cache", "responses.sqlite3"))
+RESPONSE_CACHE_MEMORY_SIZE = int(get_secret("RESPONSE_CACHE_MEMORY_SIZE", 2048))
+RESPONSE_CACHE_STALE_TTL = float(get_secret("RESPONSE_CACHE_STALE_TTL", 3600))
+RESPONSE_CACHE_TTLS = {
+    "flights": float(get_secret("FLIGHT_CACHE_TTL", 15 * 60)),
+    "hotels": float(get_secret("HOTEL_CACHE_TTL", 30 * 60)),
+    "products": float(get_secret("PRODUCT_CACHE_TTL", 60 * 60)),
+    "menus": float(get_secret("MENU_CACHE_TTL", 24 * 3600)),
+}
+
+# Menu analysis prefetch for listed restaurants (see components/recipe_tab.py)
+MENU_PREFETCH_WORKERS = int(get_secret("MENU_PREFETCH_WORKERS", 3))
+MENU_PREFETCH_RETRY = 600  # seconds before a failed analysis is prefetched again
+
 # Fetch Agents
 FETCH_AGENTS = {
     "flight": get_secret("FETCH_FLIGHT_AGENT_ID"),
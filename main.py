@@ -9,6 +9,7 @@ from components.hotel_tab import hotel_tab
 from components.shopping_tab import shopping_tab
 from components.recipe_tab import restaurant_tab
 from components.chat_tab import chat_tab
+from services.graph_schema import ensure_schema
 
 from config import THEME  # Removed unused import
 
@@ -30,6 +31,8 @@ def main():
     st.set_page_config(layout="wide", page_title="Voyager AI", page_icon="🌍")
     set_custom_theme()
     
+    # Make sure Neo4j constraints/indexes exist (once per process, on a background thread)
+    ensure_schema()
     
     # Initialize session state
     init_session_state()
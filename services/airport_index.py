@@ -0,0 +1,85 @@
+# Offline nearest-airport lookup over the bundled airport dataset
+import csv
+import os
+import threading
+import numpy as np
+from config import AIRPORTS_DATA_PATH, AIRPORT_INDEX_DIR
+
+EARTH_RADIUS_KM = 6371.0088
+
+_META_DTYPE = np.dtype([
+    ("iata", "U3"), ("name", "U64"), ("city", "U40"),
+    ("country", "U2"), ("lat", "f8"), ("lon", "f8")
+])
+
+_index = None
+_lock = threading.Lock()
+
+def _to_unit_vectors(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+def _index_paths(out_dir):
+    return os.path.join(out_dir, "airports_meta.npy"), os.path.join(out_dir, "airports_xyz.npy")
+
+def _save_atomic(path, array):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+def build_index(csv_path=AIRPORTS_DATA_PATH, out_dir=AIRPORT_INDEX_DIR):
+    """Compile the airport CSV into .npy arrays that workers memory-map"""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        rows = [
+            (r["iata"].upper(), r["name"], r["city"], r["country"].upper(), float(r["lat"]), float(r["lon"]))
+            for r in csv.DictReader(f) if len(r.get("iata") or "") == 3
+        ]
+    meta = np.array(rows, dtype=_META_DTYPE)
+    os.makedirs(out_dir, exist_ok=True)
+    meta_path, xyz_path = _index_paths(out_dir)
+    _save_atomic(xyz_path, _to_unit_vectors(meta["lat"], meta["lon"]))
+    _save_atomic(meta_path, meta)
+    return len(meta)
+
+def get_index():
+    """Return (meta, xyz) memory-mapped arrays, rebuilding them if the CSV changed"""
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                meta_path, xyz_path = _index_paths(AIRPORT_INDEX_DIR)
+                csv_mtime = os.path.getmtime(AIRPORTS_DATA_PATH)
+                if not (os.path.exists(meta_path) and os.path.exists(xyz_path)) \
+                        or os.path.getmtime(meta_path) < csv_mtime:
+                    build_index()
+                _index = (np.load(meta_path, mmap_mode="r"), np.load(xyz_path, mmap_mode="r"))
+    return _index
+
+def _as_dict(row, cos_angle):
+    return {
+        "iata": str(row["iata"]), "name": str(row["name"]), "city": str(row["city"]),
+        "country": str(row["country"]), "lat": float(row["lat"]), "lon": float(row["lon"]),
+        "distance_km": float(EARTH_RADIUS_KM * np.arccos(np.clip(cos_angle, -1.0, 1.0)))
+    }
+
+def nearest_airport(lat, lon, max_km=None):
+    """Closest airport to (lat, lon), or None if it is further than max_km"""
+    meta, xyz = get_index()
+    if len(meta) == 0:
+        return None
+    # On the unit sphere the nearest point has the largest dot product
+    cos_angles = xyz @ _to_unit_vectors(float(lat), float(lon))
+    i = int(np.argmax(cos_angles))
+    airport = _as_dict(meta[i], cos_angles[i])
+    if max_km is not None and airport["distance_km"] > max_km:
+        return None
+    return airport
+
+def airports_within(lat, lon, radius_km, limit=None):
+    """All airports within radius_km of (lat, lon), nearest first"""
+    meta, xyz = get_index()
+    cos_angles = xyz @ _to_unit_vectors(float(lat), float(lon))
+    matches = np.nonzero(cos_angles >= np.cos(radius_km / EARTH_RADIUS_KM))[0]
+    matches = matches[np.argsort(-cos_angles[matches])][:limit]
+    return [_as_dict(meta[i], cos_angles[i]) for i in matches]
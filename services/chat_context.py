@@ -0,0 +1,147 @@
+# Token-budgeted chat context: recent turns verbatim, older turns as a rolling summary
+import hashlib
+import threading
+from services.llm_cache import cached_completion
+from config import (
+    CHAT_CONTEXT_MAX_TOKENS, CHAT_CONTEXT_REPLY_TOKENS, CHAT_CONTEXT_KEEP_RATIO,
+    CHAT_SUMMARY_MAX_TOKENS, CHAT_SUMMARY_MODEL
+)
+
+# Context window per model; unknown models get the smallest one
+MODEL_CONTEXT_WINDOWS = {
+    "llama3-8b-8192": 8192,
+    "llama3-70b-8192": 8192,
+    "mixtral-8x7b-32768": 32768,
+    "gemma-7b-it": 8192,
+}
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators per message
+QUESTION_SHARE = 0.5  # a single question may use at most this share of the budget
+
+_SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a traveller and a travel assistant. "
+    "Update the summary with the new messages. Keep destinations, dates, budgets, preferences, "
+    "bookings and open questions; drop small talk. Reply with the updated summary only, "
+    "in under {limit} words."
+)
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token, no tokenizer needed)"""
+    return len(text) // 4 + 1
+
+def message_tokens(message):
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+def prompt_budget(model):
+    """Tokens available for the prompt: the configured cap, less room for the reply"""
+    window = MODEL_CONTEXT_WINDOWS.get(model, min(MODEL_CONTEXT_WINDOWS.values()))
+    return min(CHAT_CONTEXT_MAX_TOKENS, window - CHAT_CONTEXT_REPLY_TOKENS)
+
+def _digest(message):
+    return hashlib.sha1(f"{message['role']}:{message['content']}".encode()).hexdigest()
+
+class ConversationContext:
+    """Builds the messages for one model call from an ever-growing history.
+
+    Turns that no longer fit the budget are folded into a summary, which is
+    updated incrementally: each update sends only the previous summary and
+    the newly folded turns. Folding stops once the recent turns are back
+    under keep_ratio of the budget, so the summary changes every few turns
+    rather than every turn and is reused in between.
+    """
+
+    def __init__(self, client, model, system_prompt=None, budget=None, keep_ratio=CHAT_CONTEXT_KEEP_RATIO):
+        self.client = client
+        self.model = model
+        self.system_prompt = system_prompt
+        self.budget = budget or prompt_budget(model)
+        self.keep_ratio = keep_ratio
+        self.summary = ""
+        self.folded = 0  # history[:folded] is covered by the summary
+        self._last_folded = None
+        self.summary_updates = 0
+        self.last_prompt_tokens = 0
+        self._lock = threading.Lock()
+
+    def reset(self):
+        self.summary = ""
+        self.folded = 0
+        self._last_folded = None
+
+    def _fixed_messages(self):
+        messages = []
+        if self.system_prompt:
+            messages.append({"role": "system", "content": self.system_prompt})
+        if self.summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation: {self.summary}"})
+        return messages
+
+    def _summarize(self, turns):
+        """Fold turns into the summary; on failure keep the old one (those turns are dropped)"""
+        limit = CHAT_SUMMARY_MAX_TOKENS * 3 // 4
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in turns)
+        previous = self.summary or "(empty)"
+        try:
+            self.summary = cached_completion(
+                self.client,
+                messages=[
+                    {"role": "system", "content": _SUMMARY_PROMPT.format(limit=limit)},
+                    {"role": "user", "content": f"Current summary:\n{previous}\n\nNew messages:\n{transcript}"}
+                ],
+                model=CHAT_SUMMARY_MODEL,
+                max_tokens=CHAT_SUMMARY_MAX_TOKENS,
+                temperature=0
+            ).strip()
+            self.summary_updates += 1
+        except Exception as e:
+            print(f"Could not update conversation summary: {e}")
+
+    def build(self, history, message):
+        """Messages for a call answering `message`, given the earlier `history` turns"""
+        history = [{"role": m["role"], "content": m["content"]} for m in history if m.get("content")]
+        # An oversized question is cut down so the prompt (and the reply) still fit
+        limit = int(self.budget * QUESTION_SHARE) - MESSAGE_OVERHEAD_TOKENS
+        if estimate_tokens(message) > limit:
+            message = message[:limit * 4] + " [truncated]"
+        question = {"role": "user", "content": message}
+        with self._lock:
+            # A history that no longer extends the one we summarized starts over
+            if self.folded and (len(history) < self.folded or _digest(history[self.folded - 1]) != self._last_folded):
+                self.reset()
+
+            available = self.budget - message_tokens(question)
+            recent = history[self.folded:]
+            sizes = [message_tokens(m) for m in recent]
+            total = sum(sizes)
+            if total + sum(map(message_tokens, self._fixed_messages())) > available:
+                target = available * self.keep_ratio
+                cut = 0
+                while cut < len(recent) and total > target:
+                    total -= sizes[cut]
+                    cut += 1
+                # Nothing to fold when only the fixed messages overflow
+                if cut:
+                    self._summarize(recent[:cut])
+                    self.folded += cut
+                    self._last_folded = _digest(history[self.folded - 1])
+                    recent = recent[cut:]
+
+            messages = self._fixed_messages()
+            # An oversized summary or single turn still must not overflow the window
+            room = available - sum(map(message_tokens, messages))
+            kept = []
+            for m in reversed(recent):
+                room -= message_tokens(m)
+                if room < 0:
+                    break
+                kept.append(m)
+            messages += kept[::-1] + [question]
+            self.last_prompt_tokens = sum(map(message_tokens, messages))
+            return messages
+
+    def stats(self):
+        return {
+            "budget": self.budget,
+            "prompt_tokens": self.last_prompt_tokens,
+            "summarized_turns": self.folded,
+            "summary_updates": self.summary_updates,
+        }
@@ -0,0 +1,125 @@
+# Per-provider circuit breakers with half-open probing
+import threading
+import time
+from collections import deque
+from config import (
+    CIRCUIT_FAILURE_RATE, CIRCUIT_MIN_CALLS, CIRCUIT_WINDOW, CIRCUIT_RESET_TIMEOUT,
+    CIRCUIT_HALF_OPEN_PROBES, CIRCUIT_SLOW_CALL_SECONDS, CIRCUIT_BREAKER_HOSTS
+)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open"""
+
+class CircuitBreaker:
+    def __init__(self, name, failure_rate=CIRCUIT_FAILURE_RATE, min_calls=CIRCUIT_MIN_CALLS,
+                 window=CIRCUIT_WINDOW, reset_timeout=CIRCUIT_RESET_TIMEOUT,
+                 half_open_probes=CIRCUIT_HALF_OPEN_PROBES, slow_call=CIRCUIT_SLOW_CALL_SECONDS):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.slow_call = slow_call
+        self.state = CLOSED
+        self._calls = deque(maxlen=window)  # (ok, latency seconds)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError (fail fast).
+
+        Returns True when the call is a half-open probe; pass that to
+        record() or, if the call is abandoned before it is sent, release().
+        """
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+                self.state, self._probes = HALF_OPEN, 0
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    raise CircuitOpenError(f"{self.name} is unavailable (probing)")
+                self._probes += 1
+                return True
+            return False
+
+    def release(self, probe):
+        """Give back a probe slot for a call that was never sent"""
+        if probe:
+            with self._lock:
+                self._probes = max(0, self._probes - 1)
+
+    def record(self, ok, latency, probe=False):
+        """Record a finished call; slow calls count as failures"""
+        ok = ok and latency < self.slow_call
+        with self._lock:
+            self._calls.append((ok, latency))
+            if self.state == HALF_OPEN:
+                # Only probes decide recovery; calls admitted while closed just finish
+                if not probe:
+                    return
+                self._probes = max(0, self._probes - 1)
+                if ok:
+                    self.state = CLOSED
+                    self._calls.clear()
+                else:
+                    self._open()
+            elif self.state == CLOSED and len(self._calls) >= self.min_calls:
+                failures = sum(1 for call_ok, _ in self._calls if not call_ok)
+                if failures / len(self._calls) >= self.failure_rate:
+                    self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+
+    def call(self, fn, *args, **kwargs):
+        probe = self.before_call()
+        start = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record(False, time.monotonic() - start, probe)
+            raise
+        self.record(True, time.monotonic() - start, probe)
+        return result
+
+    def status(self):
+        with self._lock:
+            calls = list(self._calls)
+            state = self.state
+        latencies = sorted(latency for _, latency in calls)
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000) if latencies else None
+
+        return {
+            "name": self.name,
+            "state": state,
+            "calls": len(calls),
+            "error_rate": round(sum(1 for ok, _ in calls if not ok) / len(calls), 3) if calls else 0.0,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+        }
+
+_breakers = {}
+_lock = threading.Lock()
+
+def is_protected(host):
+    return host.endswith(".rapidapi.com") or host in CIRCUIT_BREAKER_HOSTS
+
+def get_breaker(name):
+    with _lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+def breaker_status():
+    """State, error rate and latency percentiles for every breaker"""
+    with _lock:
+        breakers = list(_breakers.values())
+    return [breaker.status() for breaker in breakers]
@@ -0,0 +1,27 @@
+# Concurrent provider fan-out with a shared deadline
+from concurrent.futures import ThreadPoolExecutor, wait
+from config import FANOUT_MAX_WORKERS
+
+_pool = ThreadPoolExecutor(max_workers=FANOUT_MAX_WORKERS, thread_name_prefix="provider-fanout")
+
+def fan_out(tasks, deadline):
+    """Run {name: callable} concurrently and wait at most `deadline` seconds.
+
+    Returns (results, timed_out, errors): results for the calls that finished
+    in time, the names of the ones that didn't, and exceptions by name.
+    Late calls keep running in the pool but their results are discarded.
+    """
+    futures = {name: _pool.submit(task) for name, task in tasks.items()}
+    done, _ = wait(futures.values(), timeout=deadline)
+
+    results, timed_out, errors = {}, [], {}
+    for name, future in futures.items():
+        if future not in done:
+            future.cancel()
+            timed_out.append(name)
+            continue
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            errors[name] = e
+    return results, timed_out, errors
@@ -0,0 +1,135 @@
+# Exchange-rate table: fetched once per refresh interval, persisted, applied in bulk
+import json
+import os
+import re
+import threading
+import time
+import numpy as np
+from services import http_client
+from config import (
+    EXCHANGE_RATE_API_KEY, FX_BASE_CURRENCY, FX_RATES_PATH,
+    FX_REFRESH_INTERVAL, FX_RETRY_INTERVAL
+)
+
+_AMOUNT = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+# Offered before any rate table has been fetched
+COMMON_CURRENCIES = [
+    "AED", "AUD", "BRL", "CAD", "CHF", "CNY", "EUR", "GBP", "HKD", "INR",
+    "JPY", "KRW", "MXN", "NZD", "PKR", "SAR", "SEK", "SGD", "TRY", "USD", "ZAR",
+]
+
+_table = None  # {"base", "rates", "fetched_at"}
+_last_attempt = 0.0
+_refreshing = False
+_lock = threading.Lock()
+
+def parse_amount(value):
+    """Numeric part of a price like 'US$1,234' or 99.5 (NaN if there is none)"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _AMOUNT.search(str(value or ""))
+    return float(match.group().replace(",", "")) if match else np.nan
+
+def _load_file():
+    try:
+        with open(FX_RATES_PATH, encoding="utf-8") as f:
+            table = json.load(f)
+        return table if table.get("base") == FX_BASE_CURRENCY else None
+    except (OSError, ValueError):
+        return None
+
+def _save_file(table):
+    os.makedirs(os.path.dirname(FX_RATES_PATH) or ".", exist_ok=True)
+    tmp = f"{FX_RATES_PATH}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(table, f)
+    os.replace(tmp, FX_RATES_PATH)
+
+def fetch_rates(base=FX_BASE_CURRENCY):
+    """All rates for one base currency from ExchangeRate-API; raises on failure"""
+    if not EXCHANGE_RATE_API_KEY:
+        raise RuntimeError("EXCHANGE_RATE_API_KEY is not configured")
+    response = http_client.get(f"https://v6.exchangerate-api.com/v6/{EXCHANGE_RATE_API_KEY}/latest/{base}")
+    response.raise_for_status()
+    data = response.json()
+    if data.get("result") != "success":
+        raise RuntimeError(f"Exchange rate lookup failed: {data.get('error-type', 'unknown error')}")
+    return data["conversion_rates"]
+
+def _refresh():
+    global _table, _refreshing
+    try:
+        table = {"base": FX_BASE_CURRENCY, "rates": fetch_rates(), "fetched_at": time.time()}
+        _save_file(table)
+        _table = table
+    except Exception as e:
+        previous = _table
+        since = f"keeping rates from {time.ctime(previous['fetched_at'])}" if previous else "no rates yet"
+        print(f"Exchange rate refresh failed ({since}): {e}")
+    finally:
+        _refreshing = False
+
+def get_rates(wait=True):
+    """The current rate table, refreshed at most once per FX_REFRESH_INTERVAL.
+
+    The table is shared by every session and persisted to FX_RATES_PATH so
+    restarts and other worker processes reuse it. An expired table keeps
+    being served while a background thread refreshes it. Without any table
+    the first caller fetches inline (in the background with wait=False).
+    Attempts, failed or not, are at least FX_RETRY_INTERVAL apart, so an
+    unreachable API isn't called on every rerun; only a missing table raises.
+    """
+    global _table, _last_attempt, _refreshing
+    table = _table
+    if table is not None and time.time() - table["fetched_at"] < FX_REFRESH_INTERVAL:
+        return table
+    with _lock:
+        if _table is None:
+            _table = _load_file()
+        table = _table
+        now = time.time()
+        expired = table is None or now - table["fetched_at"] >= FX_REFRESH_INTERVAL
+        due = expired and not _refreshing and now - _last_attempt >= FX_RETRY_INTERVAL
+        if due:
+            _last_attempt, _refreshing = now, True
+    if due:
+        if table is None and wait:
+            _refresh()
+        else:
+            threading.Thread(target=_refresh, name="fx-refresh", daemon=True).start()
+    if _table is None:
+        raise RuntimeError("Exchange rates unavailable")
+    return _table
+
+def rate(from_currency, to_currency, wait=False):
+    """Units of to_currency per unit of from_currency.
+
+    Doesn't fetch inline unless wait=True: before the first table has loaded
+    it raises, and callers show base-currency prices meanwhile.
+    """
+    if from_currency == to_currency:
+        return 1.0
+    rates = get_rates(wait=wait)["rates"]
+    try:
+        return rates[to_currency] / rates[from_currency]
+    except KeyError as e:
+        raise ValueError(f"Unknown currency {e.args[0]}") from None
+
+def convert(amounts, from_currency, to_currency, wait=False):
+    """Convert a whole sequence of amounts (numbers or price strings) in one pass.
+
+    Returns a float array; unparseable amounts come back as NaN.
+    """
+    values = np.fromiter((parse_amount(a) for a in amounts), dtype=float)
+    return values * rate(from_currency, to_currency, wait)
+
+def currencies():
+    """Currency codes in the current table (COMMON_CURRENCIES until one is loaded); never blocks"""
+    try:
+        return sorted(get_rates(wait=False)["rates"])
+    except Exception:
+        return COMMON_CURRENCIES
+
+def format_amount(amount, currency):
+    return "N/A" if amount is None or np.isnan(amount) else f"{amount:,.2f} {currency}"
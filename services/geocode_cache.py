@@ -0,0 +1,140 @@
+# Persistent geocoding cache: in-memory LRU in front of a shared SQLite store
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from services import http_client
+from services.ttl_cache import TTLCache
+from config import (
+    LOCATIONIQ_API_KEY, GEOCODE_CACHE_PATH,
+    GEOCODE_TTL, GEOCODE_NEGATIVE_TTL, GEOCODE_MEMORY_SIZE, GEOCODE_WARM_FILE
+)
+
+_MISSING = object()
+_NOT_FOUND = {}  # cached marker for "provider had no result"
+
+_memory = TTLCache(maxsize=GEOCODE_MEMORY_SIZE, ttl=GEOCODE_TTL)
+_local = threading.local()
+
+def normalize_query(query):
+    """Canonical cache key: NFKC, lowercase, single spaces, no edge punctuation"""
+    query = unicodedata.normalize("NFKC", str(query)).lower()
+    query = re.sub(r"\s+", " ", query)
+    return query.strip(" ,.;")
+
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(GEOCODE_CACHE_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(GEOCODE_CACHE_PATH, timeout=5)
+        # WAL lets every Streamlit worker process read while one writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS geocode (
+                provider TEXT NOT NULL,
+                query TEXT NOT NULL,
+                result TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (provider, query)
+            )
+        """)
+        _local.conn = conn
+    return conn
+
+def _load(provider, key):
+    """(value, expires_at) from disk, or (_MISSING, None)"""
+    row = _connect().execute(
+        "SELECT result, expires_at FROM geocode WHERE provider = ? AND query = ?",
+        (provider, key)
+    ).fetchone()
+    if row is None or row[1] < time.time():
+        return _MISSING, None
+    return json.loads(row[0]), row[1]
+
+def store(provider, query, result, ttl=None):
+    """Save a provider result (None means "not found") in both cache tiers"""
+    key = normalize_query(query)
+    value = _NOT_FOUND if result is None else result
+    ttl = ttl or (GEOCODE_NEGATIVE_TTL if result is None else GEOCODE_TTL)
+    conn = _connect()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO geocode (provider, query, result, expires_at) VALUES (?, ?, ?, ?)",
+            (provider, key, json.dumps(value), time.time() + ttl)
+        )
+    _memory.set((provider, key), value, ttl=ttl)
+
+def cached_geocode(provider, query, fetch):
+    """Return the cached result for (provider, query), calling fetch(query) on a miss.
+
+    fetch returns the provider's first match or None when nothing was found;
+    it should raise on transport/quota errors so those are never cached.
+    """
+    key = normalize_query(query)
+    value = _memory.get((provider, key), _MISSING)
+    if value is _MISSING:
+        try:
+            value, expires_at = _load(provider, key)
+        except sqlite3.Error as e:
+            print(f"Geocode cache read failed: {e}")
+        if value is not _MISSING:
+            # Keep the disk entry's remaining lifetime (short for "not found")
+            _memory.set((provider, key), value, ttl=expires_at - time.time())
+    if value is _MISSING:
+        result = fetch(query)
+        try:
+            store(provider, query, result)
+        except sqlite3.Error as e:
+            print(f"Geocode cache write failed: {e}")
+        return result
+    return None if value == _NOT_FOUND else value
+
+def warm_from_file(path):
+    """Preload entries from a JSON file of [{"provider", "query", "result"}, ...]"""
+    with open(path) as f:
+        entries = json.load(f)
+    for entry in entries:
+        store(entry["provider"], entry["query"], entry.get("result"))
+    return len(entries)
+
+# --- Provider lookups ---
+def _locationiq_fetch(query):
+    response = http_client.get(
+        "https://us1.locationiq.com/v1/search.php",
+        params={"key": LOCATIONIQ_API_KEY, "q": query, "format": "json",
+                "limit": 1, "addressdetails": 1}
+    )
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    data = response.json()
+    return data[0] if data else None
+
+def _nominatim_fetch(query):
+    response = http_client.get(
+        "https://nominatim.openstreetmap.org/search",
+        params={"q": query, "format": "json", "limit": 1},
+        headers={"User-Agent": "hotel-search-app"},
+        timeout=10
+    )
+    response.raise_for_status()
+    data = response.json()
+    return data[0] if data else None
+
+def locationiq_search(query):
+    """First LocationIQ match for query (dict with lat/lon/address...), or None"""
+    return cached_geocode("locationiq", query, _locationiq_fetch)
+
+def nominatim_search(query):
+    """First Nominatim match for query, or None"""
+    return cached_geocode("nominatim", query, _nominatim_fetch)
+
+# Optional warm start from a bundled file (once per process)
+if GEOCODE_WARM_FILE and os.path.exists(GEOCODE_WARM_FILE):
+    try:
+        print(f"Geocode cache warmed with {warm_from_file(GEOCODE_WARM_FILE)} entries")
+    except Exception as e:
+        print(f"Geocode cache warm-up failed: {e}")
@@ -0,0 +1,67 @@
+# Geohash encoding and tile cover for bounding boxes
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+def encode(lat, lon, precision):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if coord >= mid:
+            value = (value << 1) | 1
+            rng[0] = mid
+        else:
+            value <<= 1
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+def cell_size(precision):
+    """(lat degrees, lon degrees) spanned by one cell at this precision"""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+def precision_for(height, width):
+    """Finest precision whose cells span at least height x width degrees.
+
+    A box that size intersects at most 2 x 2 such cells; any finer
+    precision needs many more cells (provider calls) to cover it.
+    """
+    for precision in range(12, 0, -1):
+        dlat, dlon = cell_size(precision)
+        if dlat >= height and dlon >= width:
+            return precision
+    return 1
+
+def decode_bbox(geohash):
+    """(sw_lat, sw_lon, ne_lat, ne_lon) of a geohash cell"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if value >> shift & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+def covering(sw_lat, sw_lon, ne_lat, ne_lon, precision):
+    """Geohashes of every cell intersecting the box, row by row from the south-west"""
+    dlat, dlon = cell_size(precision)
+    sw_lat, ne_lat = max(sw_lat, -90.0), min(ne_lat, 90.0 - 1e-9)
+    sw_lon, ne_lon = max(sw_lon, -180.0), min(ne_lon, 180.0 - 1e-9)
+    first_row, last_row = int((sw_lat + 90) // dlat), int((ne_lat + 90) // dlat)
+    first_col, last_col = int((sw_lon + 180) // dlon), int((ne_lon + 180) // dlon)
+    return [
+        encode(-90 + (row + 0.5) * dlat, -180 + (col + 0.5) * dlon, precision)
+        for row in range(first_row, last_row + 1)
+        for col in range(first_col, last_col + 1)
+    ]
@@ -0,0 +1,92 @@
+# Idempotent Neo4j schema bootstrap (constraints + lookup indexes)
+import threading
+import time
+from neo4j.exceptions import Neo4jError
+from services.neo4j_pool import get_session
+from config import NEO4J_SCHEMA_RETRY_INTERVAL
+
+# Uniqueness constraints for every label the logging queries MERGE on
+CONSTRAINTS = {
+    "user_id_unique": ("User", "id"),
+    "airport_code_unique": ("Airport", "code"),
+    "city_name_unique": ("City", "name"),
+    "product_category_name_unique": ("ProductCategory", "name"),
+    "popular_product_query_unique": ("PopularProduct", "query"),
+    "restaurant_id_unique": ("Restaurant", "id"),
+}
+
+# Range indexes for filters and sorts used by the read paths
+INDEXES = {
+    "search_timestamp": ("Search", "timestamp"),
+    "search_type": ("Search", "type"),
+}
+
+_applied = False
+_running = False
+_last_attempt = 0.0
+_lock = threading.Lock()
+
+def _existing_names(session, kind):
+    return {record["name"] for record in session.run(f"SHOW {kind} YIELD name")}
+
+def apply_schema():
+    """Create any missing constraints and indexes.
+
+    Returns the names actually created on this run (per the query counters;
+    IF NOT EXISTS is a no-op when an equivalent one exists under another
+    name) and those the database refused, e.g. a uniqueness constraint over
+    existing duplicates: {"constraints": [...], "indexes": [...], "failed": {name: error}}.
+    """
+    created = {"constraints": [], "indexes": [], "failed": {}}
+    statements = [
+        ("constraints", name, f"CREATE CONSTRAINT {name} IF NOT EXISTS FOR (n:{label}) REQUIRE n.{prop} IS UNIQUE")
+        for name, (label, prop) in CONSTRAINTS.items()
+    ] + [
+        ("indexes", name, f"CREATE INDEX {name} IF NOT EXISTS FOR (n:{label}) ON (n.{prop})")
+        for name, (label, prop) in INDEXES.items()
+    ]
+    with get_session() as session:
+        existing = {"constraints": _existing_names(session, "CONSTRAINTS"),
+                    "indexes": _existing_names(session, "INDEXES")}
+        for kind, name, statement in statements:
+            if name in existing[kind]:
+                continue
+            try:
+                counters = session.run(statement).consume().counters
+            except Neo4jError as e:
+                created["failed"][name] = e.message or str(e)
+                continue
+            if counters.constraints_added if kind == "constraints" else counters.indexes_added:
+                created[kind].append(name)
+    return created
+
+def _bootstrap():
+    global _applied, _running
+    try:
+        created = apply_schema()
+        if created["constraints"] or created["indexes"]:
+            print(f"Neo4j schema created: {created['constraints'] + created['indexes']}")
+        if created["failed"]:
+            print(f"Neo4j schema items not created (retrying later): {created['failed']}")
+        else:
+            _applied = True
+    except Exception as e:
+        print(f"Neo4j schema bootstrap failed: {e}")
+    finally:
+        _running = False
+
+def ensure_schema():
+    """Apply the schema once per process without blocking the caller.
+
+    Safe to call on every Streamlit rerun: the bootstrap runs on a
+    background thread, and after a failure (Neo4j down, a constraint over
+    duplicate data) it is retried at most every NEO4J_SCHEMA_RETRY_INTERVAL.
+    """
+    global _running, _last_attempt
+    if _applied:
+        return
+    with _lock:
+        if _applied or _running or time.monotonic() - _last_attempt < NEO4J_SCHEMA_RETRY_INTERVAL:
+            return
+        _running, _last_attempt = True, time.monotonic()
+    threading.Thread(target=_bootstrap, name="neo4j-schema", daemon=True).start()
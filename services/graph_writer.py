@@ -0,0 +1,146 @@
+# Write-behind batching for Neo4j search and interaction logging
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from neo4j.exceptions import Neo4jError
+from services.neo4j_pool import get_session
+from config import (
+    GRAPH_WRITER_BATCH_SIZE, GRAPH_WRITER_FLUSH_INTERVAL,
+    GRAPH_WRITER_QUEUE_SIZE, GRAPH_WRITER_ENQUEUE_TIMEOUT
+)
+
+# event type -> Cypher that consumes a list of events bound to $events
+_queries = {}
+_queue = queue.Queue(maxsize=GRAPH_WRITER_QUEUE_SIZE)
+_worker = None
+_worker_lock = threading.Lock()
+_listeners = []
+_STOP = object()
+
+def register_event_type(event_type, query):
+    """Register the `UNWIND $events AS e ...` query used to write an event type"""
+    _queries[event_type] = query
+
+def add_flush_listener(listener):
+    """Call listener(event_type, events) after each batch is committed"""
+    _listeners.append(listener)
+
+def enqueue(event_type, **params):
+    """Queue one event for the background writer; the UI thread never waits on Neo4j.
+
+    Blocks for at most GRAPH_WRITER_ENQUEUE_TIMEOUT seconds when the queue is
+    full (backpressure) and returns False if the event had to be dropped.
+    """
+    if event_type not in _queries:
+        raise KeyError(f"Unknown graph event type: {event_type}")
+    _ensure_worker()
+    # Stamp the event now so batching delay doesn't skew the stored timestamp
+    params.setdefault("ts", datetime.now(timezone.utc).isoformat())
+    try:
+        _queue.put((event_type, params), timeout=GRAPH_WRITER_ENQUEUE_TIMEOUT)
+        return True
+    except queue.Full:
+        print(f"Graph writer queue full, dropped '{event_type}' event")
+        return False
+
+def flush(timeout=10):
+    """Block until everything queued so far has been written (or timeout)"""
+    if _worker is None or not _worker.is_alive():
+        return True
+    done = threading.Event()
+    try:
+        _queue.put(done, timeout=timeout)
+    except queue.Full:
+        return False
+    return done.wait(timeout)
+
+def shutdown(timeout=10):
+    """Flush pending events and stop the writer thread"""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            return
+        _queue.put(_STOP)
+        _worker.join(timeout)
+        _worker = None
+
+def _ensure_worker():
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name="graph-writer", daemon=True)
+            _worker.start()
+
+def _run():
+    pending = {}
+    count = 0
+    deadline = time.monotonic() + GRAPH_WRITER_FLUSH_INTERVAL
+    while True:
+        try:
+            item = _queue.get(timeout=max(0, deadline - time.monotonic()))
+        except queue.Empty:
+            item = None
+
+        if item is _STOP:
+            _write(pending)
+            return
+        if isinstance(item, threading.Event):
+            _write(pending)
+            pending, count = {}, 0
+            item.set()
+            continue
+        if item is not None:
+            event_type, params = item
+            pending.setdefault(event_type, []).append(params)
+            count += 1
+
+        if count >= GRAPH_WRITER_BATCH_SIZE or time.monotonic() >= deadline:
+            _write(pending)
+            pending, count = {}, 0
+            deadline = time.monotonic() + GRAPH_WRITER_FLUSH_INTERVAL
+
+def _run_batch(query, events):
+    with get_session() as session:
+        session.execute_write(lambda tx: tx.run(query, events=events).consume())
+
+def _write_one_by_one(event_type, query, events):
+    """Retry a rejected batch per event so only the bad events are lost"""
+    written = []
+    for event in events:
+        try:
+            _run_batch(query, [event])
+            written.append(event)
+        except Neo4jError as e:
+            print(f"Graph writer dropped a '{event_type}' event {event}: {e}")
+    return written
+
+def _write(pending):
+    """Write each event type's batch as a single UNWIND transaction"""
+    for event_type, events in pending.items():
+        query = _queries[event_type]
+        try:
+            _run_batch(query, events)
+        except Neo4jError as e:
+            # The query rejected some event (e.g. a null MERGE key): isolate it
+            print(f"Graph writer batch of {len(events)} '{event_type}' events failed, retrying singly: {e}")
+            try:
+                events = _write_one_by_one(event_type, query, events)
+            except Exception as e:
+                print(f"Graph writer failed to store '{event_type}' events: {e}")
+                continue
+        except Exception as e:
+            print(f"Graph writer failed to store {len(events)} '{event_type}' events: {e}")
+            continue
+        if not events:
+            continue
+        for listener in _listeners:
+            try:
+                listener(event_type, events)
+            except Exception as e:
+                print(f"Graph writer listener failed: {e}")
+
+atexit.register(shutdown)
@@ -0,0 +1,102 @@
+# Compact hotel records and a single-pass booking-com18 normalizer
+HOTEL_FIELDS = (
+    "id", "name", "price", "original_price",
+    "review_score", "review_count", "review_word", "photo_url", "address",
+    "checkin_date", "checkout_date", "checkin_time", "checkout_time",
+    "property_class", "longitude", "latitude",
+)
+# Bumped whenever HOTEL_FIELDS changes, so cached rows in the old layout are ignored
+HOTEL_SCHEMA = 1
+
+_EMPTY = {}
+
+class Hotel:
+    """One hotel as a slotted record (no per-instance dict).
+
+    Supports hotel['name'] and hotel.get('name') so display code written
+    against the old dicts keeps working.
+    """
+    __slots__ = HOTEL_FIELDS
+
+    def __init__(self, id, name, price, original_price, review_score, review_count,
+                 review_word, photo_url, address, checkin_date, checkout_date,
+                 checkin_time, checkout_time, property_class, longitude, latitude):
+        self.id = id
+        self.name = name
+        self.price = price
+        self.original_price = original_price
+        self.review_score = review_score
+        self.review_count = review_count
+        self.review_word = review_word
+        self.photo_url = photo_url
+        self.address = address
+        self.checkin_date = checkin_date
+        self.checkout_date = checkout_date
+        self.checkin_time = checkin_time
+        self.checkout_time = checkout_time
+        self.property_class = property_class
+        self.longitude = longitude
+        self.latitude = latitude
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except (AttributeError, TypeError):
+            raise KeyError(name) from None
+
+    def get(self, name, default=None):
+        return getattr(self, name, default) if name in HOTEL_FIELDS else default
+
+    def __repr__(self):
+        return f"Hotel(id={self.id!r}, name={self.name!r})"
+
+    def to_row(self):
+        return [getattr(self, name) for name in HOTEL_FIELDS]
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row)
+
+def _amount(block, key):
+    return ((block.get(key) or _EMPTY).get("amountPerStay") or _EMPTY).get("amountRounded")
+
+def normalize_booking_results(results):
+    """Flatten booking-com18 search-by-geo results into rows in HOTEL_FIELDS order.
+
+    Each nested block is looked up once per property. Rows are plain lists,
+    so they can be stored in any response cache backend as-is.
+    """
+    rows = []
+    append = rows.append
+    for item in results:
+        if not isinstance(item, dict):
+            continue
+        basic = item.get("basicPropertyData") or _EMPTY
+        reviews = basic.get("reviews") or _EMPTY
+        location = basic.get("location") or _EMPTY
+        prices = item.get("priceDisplayInfo") or _EMPTY
+        dates = item.get("recommendedDate") or _EMPTY
+        policy = item.get("checkinCheckoutPolicy") or _EMPTY
+        photo = ((basic.get("photos") or _EMPTY).get("main") or _EMPTY).get("lowResJpegUrl") or _EMPTY
+        append([
+            basic.get("id"),
+            basic.get("name", "Unknown Hotel"),
+            _amount(prices, "displayPrice") or "N/A",
+            _amount(prices, "priceBeforeDiscount") or "",
+            reviews.get("totalScore", 0),
+            reviews.get("reviewsCount", 0),
+            (reviews.get("totalScoreTextTag") or _EMPTY).get("translation", "No reviews"),
+            photo.get("absoluteUrl", ""),
+            location.get("address", ""),
+            dates.get("checkin", ""),
+            dates.get("checkout", ""),
+            policy.get("checkinTimeFromFormatted", ""),
+            policy.get("checkoutTimeUntilFormatted", ""),
+            (basic.get("starRating") or _EMPTY).get("value", 0),
+            location.get("longitude"),
+            location.get("latitude"),
+        ])
+    return rows
+
+def hotels_from_rows(rows):
+    return [Hotel(*row) for row in rows]
@@ -0,0 +1,68 @@
+# Columnar hotel results: vectorized filters, sorting and top-k in the session
+import numpy as np
+from services.airport_index import EARTH_RADIUS_KM
+from services.hotel_records import hotels_from_rows
+from services.fx_rates import parse_amount
+
+SORTABLE_COLUMNS = ("price", "review_score", "property_class", "distance_km")
+
+def _floats(values):
+    return np.array([v if isinstance(v, (int, float)) else np.nan for v in values], dtype=float)
+
+class HotelTable:
+    """Normalized hotel rows plus one NumPy array per filterable column.
+
+    Built once per search; select() only touches the arrays, so re-sorting
+    or narrowing the results never calls the provider again.
+    """
+
+    def __init__(self, rows, center=None):
+        self.hotels = hotels_from_rows(rows)
+        self.price = np.array([parse_amount(h.price) for h in self.hotels], dtype=float)
+        self.review_score = _floats([h.review_score for h in self.hotels])
+        self.property_class = _floats([h.property_class for h in self.hotels])
+        lat = _floats([h.latitude for h in self.hotels])
+        lon = _floats([h.longitude for h in self.hotels])
+        if center is None:
+            self.distance_km = np.full(len(self.hotels), np.nan)
+        else:
+            self.distance_km = _haversine_km(center[0], center[1], lat, lon)
+
+    def __len__(self):
+        return len(self.hotels)
+
+    def bounds(self, column):
+        """(min, max) of a column ignoring unknown values, or None if all are unknown"""
+        values = getattr(self, column)
+        values = values[~np.isnan(values)]
+        return (float(values.min()), float(values.max())) if len(values) else None
+
+    def select(self, ranges=None, sort_by=None, descending=False, k=None):
+        """Hotels whose columns fall inside `ranges` ({column: (low, high)}).
+
+        Rows with an unknown value in a filtered column are dropped. Sorting
+        puts unknown values last; with k set only the top k are ordered
+        (argpartition) and returned.
+        """
+        mask = np.ones(len(self.hotels), dtype=bool)
+        for column, (low, high) in (ranges or {}).items():
+            values = getattr(self, column)
+            mask &= (values >= low) & (values <= high)
+        idx = np.flatnonzero(mask)
+
+        if sort_by is not None:
+            keys = getattr(self, sort_by)[idx]
+            keys = np.where(np.isnan(keys), np.inf, -keys if descending else keys)
+            if k is not None and k < len(idx):
+                top = np.argpartition(keys, k - 1)[:k]
+                idx = idx[top[np.argsort(keys[top], kind="stable")]]
+            else:
+                idx = idx[np.argsort(keys, kind="stable")]
+        elif k is not None:
+            idx = idx[:k]
+        return [self.hotels[i] for i in idx]
+
+def _haversine_km(lat, lon, lats, lons):
+    lat, lon, lats, lons = map(np.radians, (lat, lon, lats, lons))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
@@ -0,0 +1,102 @@
+# Shared HTTP client: per-host pooled sessions, mandatory timeouts, retried GETs
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from services import rate_limiter
+from services.circuit_breaker import get_breaker, is_protected
+from config import (
+    HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_POOL_MAXSIZE,
+    HTTP_GET_RETRIES, HTTP_BACKOFF_BASE, HTTP_BACKOFF_MAX
+)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_sessions = {}
+_lock = threading.Lock()
+
+def get_session(url):
+    """Return the keep-alive session for the URL's host, creating it on first use"""
+    host = urlsplit(url).netloc
+    session = _sessions.get(host)
+    if session is None:
+        with _lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_MAXSIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _sessions[host] = session
+    return session
+
+def default_timeout():
+    return (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+def _backoff(attempt, response=None):
+    # Honour Retry-After on 429s when the provider sends it
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(HTTP_BACKOFF_MAX, float(retry_after))
+    # "Full jitter": sleep a random amount up to the exponential ceiling
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+def _send(method, url, **kwargs):
+    """One request under the host's circuit breaker and rate limit.
+
+    Raises CircuitOpenError without touching the network while the host's
+    circuit is open, and RateLimitError when its budget sheds the call.
+    """
+    host = urlsplit(url).netloc
+    breaker = get_breaker(host) if is_protected(host) else None
+    probe = breaker.before_call() if breaker is not None else False
+    try:
+        rate_limiter.acquire(host)
+    except BaseException:
+        # A shed call never reached the provider: hand its probe slot back
+        if breaker is not None:
+            breaker.release(probe)
+        raise
+    start = time.monotonic()
+    try:
+        response = getattr(get_session(url), method)(url, **kwargs)
+    except Exception:
+        if breaker is not None:
+            breaker.record(False, time.monotonic() - start, probe)
+        raise
+    if breaker is not None:
+        breaker.record(response.status_code not in RETRY_STATUSES, time.monotonic() - start, probe)
+    rate_limiter.record_response(host, response)
+    return response
+
+def get(url, params=None, headers=None, timeout=None, retries=None, **kwargs):
+    """GET through the host's pooled session, retrying transient failures.
+
+    Connection errors, timeouts and 429/5xx responses are retried up to
+    `retries` times with jittered exponential backoff. The last response
+    is returned (or the last exception raised) once retries run out.
+    Raises rate_limiter.RateLimitError if the host's budget sheds the call
+    and circuit_breaker.CircuitOpenError while the host's circuit is open.
+    """
+    timeout = timeout or default_timeout()
+    retries = HTTP_GET_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        response = None
+        try:
+            response = _send("get", url, params=params, headers=headers, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return response
+        time.sleep(_backoff(attempt, response))
+
+def post(url, data=None, json=None, headers=None, timeout=None, **kwargs):
+    """POST through the host's pooled session (never retried: not idempotent)"""
+    return _send(
+        "post", url, data=data, json=json, headers=headers,
+        timeout=timeout or default_timeout(), **kwargs
+    )
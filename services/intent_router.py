@@ -0,0 +1,266 @@
+# Local fast-path intent router: keyword automaton + slot extractors, LLM as fallback
+import re
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from config import INTENT_ROUTER_MIN_CONFIDENCE
+
+# Intent sets each caller may resolve locally
+TRAVEL_INTENTS = ("flight_search", "hotel_search", "shopping", "recipe")
+SHOPPING_INTENTS = ("shopping", "cart_view", "cart_clear", "checkout")
+
+# keyword -> (intent, weight); domain nouns outweigh generic verbs like "find"
+_KEYWORDS = {
+    "flight_search": (3, ["flight", "flights", "fly", "flying", "airfare", "plane ticket", "plane tickets", "airline"]),
+    "hotel_search": (3, ["hotel", "hotels", "hostel", "resort", "accommodation", "place to stay", "room for", "rooms in"]),
+    "recipe": (3, ["recipe", "recipes", "how to cook", "how do i cook", "how to make", "how do i make", "cook", "bake"]),
+    "cart_view": (4, ["show my cart", "view cart", "view my cart", "view the cart", "check cart", "check my cart",
+                      "check the cart", "show cart", "show the cart", "what's in my cart"]),
+    "cart_clear": (4, ["clear cart", "clear my cart", "clear the cart", "empty cart", "empty my cart", "empty the cart"]),
+    "checkout": (4, ["checkout", "check out", "place order", "place my order", "proceed to checkout"]),
+    "shopping": (2, ["buy", "shop", "shop for", "shopping", "purchase",
+                     "backpack", "backpacks", "adapter", "adapters", "charger", "chargers", "suitcase",
+                     "suitcases", "luggage", "headphones", "camera", "cameras"]),
+}
+# Generic request verbs: they only count toward shopping when no domain keyword matched,
+# and never confidently ("find restaurants in paris" is not a product search)
+_GENERIC = ("search for", "search", "find", "look for", "looking for")
+
+_INTENT_OF = {}
+for _intent, (_weight, _words) in _KEYWORDS.items():
+    for _word in _words:
+        _INTENT_OF[_word] = (_intent, _weight)
+for _word in _GENERIC:
+    _INTENT_OF[_word] = ("shopping", 0)
+# One alternation, longest keywords first, compiled once
+_AUTOMATON = re.compile(
+    r"\b(?:" + "|".join(re.escape(w) for w in sorted(_INTENT_OF, key=len, reverse=True)) + r")\b"
+)
+
+_NUMBERS = {w: i for i, w in enumerate(
+    "zero one two three four five six seven eight nine ten".split())}
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_MONTHS = {m: i for i, m in enumerate(
+    "january february march april may june july august september october november december".split(), 1)}
+
+# One or more words, never crossing a connective ("to", "from", "and", ...)
+_PLACE = r"([a-z][a-z.'\-]*(?:\s+(?!(?:to|from|and|on|for|next|this|with|in|at)\b)[a-z][a-z.'\-]*)*?)"
+_PLACE_END = r"(?=\s+(?:on|for|next|this|tomorrow|today|in\s+\d|from|to|and|with|departing|leaving|returning)\b|[,.?!]|$)"
+_FROM_TO = re.compile(rf"\bfrom\s+{_PLACE}\s+to\s+{_PLACE}{_PLACE_END}")
+_TO_FROM = re.compile(rf"\bto\s+{_PLACE}\s+from\s+{_PLACE}{_PLACE_END}")
+_TO = re.compile(rf"\b(?:to|for)\s+{_PLACE}{_PLACE_END}")
+_HOTEL_AT = re.compile(rf"\b(?:in|at|near|to)\s+{_PLACE}{_PLACE_END}")
+_COUNT = re.compile(r"\b(\d+|" + "|".join(_NUMBERS) + r")\s+(passengers?|people|persons?|adults?|tickets?|guests?|travell?ers?)\b")
+_NIGHTS = re.compile(r"\b(\d+|" + "|".join(_NUMBERS) + r")\s+nights?\b")
+_ISO_DATE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_MONTH_DATE = re.compile(r"\b(" + "|".join(_MONTHS) + r")\s+(\d{1,2})(?:st|nd|rd|th)?\b|\b(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?(" + "|".join(_MONTHS) + r")\b")
+_RELATIVE_DATE = re.compile(r"\b(today|tomorrow|day after tomorrow|next week|(?:next|this)\s+(" + "|".join(_WEEKDAYS) + r")|in\s+(\d+|" + "|".join(_NUMBERS) + r")\s+days?)\b")
+
+# Captures starting with these, or made of date words, are not places ("the airport", "my trip", "tonight")
+_NOT_PLACE_START = frozenset("a an the my our your his her their its this that these those some me us".split())
+_DATE_WORDS = frozenset(["today", "tonight", "tomorrow", "weekend", "week", "month", "year", "night", "nights"]
+                        + _WEEKDAYS + list(_MONTHS))
+
+_PRODUCT_ALIASES = {
+    "backpack": "travel backpack",
+    "adapter": "travel power adapter",
+    "charger": "travel power adapter",
+    "suitcase": "carry-on suitcase",
+    "luggage": "carry-on suitcase",
+    "headphones": "travel headphones",
+    "camera": "travel camera",
+}
+_PRODUCT_VERBS = re.compile(r"\b(?:i want to |i'd like to |i need to |can you |please )?(?:buy|shop for|shop|purchase|search for|search|find|look for|looking for|get)\b\s*(?:me\s+)?(?:an?\s+|some\s+|the\s+|a pair of\s+)?")
+_RECIPE_QUERY = re.compile(r"\b(?:recipes?\s+(?:for|of)|how (?:to|do i) (?:cook|make|bake)|cook|bake)\s+(?:an?\s+|some\s+|the\s+)?([a-z][a-z '\-]*?)(?=[,.?!]|$)|\b([a-z][a-z '\-]*?)\s+recipes?\b")
+
+@dataclass
+class IntentMatch:
+    intent: str
+    parameters: dict = field(default_factory=dict)
+    response: str = ""
+    confidence: float = 0.0
+
+def _number(token):
+    return int(token) if token.isdigit() else _NUMBERS[token]
+
+def _place(text):
+    return " ".join(w.capitalize() for w in text.split()) if text else None
+
+def _is_place(text):
+    words = text.split()
+    return bool(words) and words[0] not in _NOT_PLACE_START and not all(w in _DATE_WORDS for w in words)
+
+def _first_place(pattern, text):
+    """First capture of pattern that looks like a place name, or None"""
+    for m in pattern.finditer(text):
+        if _is_place(m.group(1)):
+            return _place(m.group(1))
+    return None
+
+def extract_dates(text, today=None):
+    """Dates mentioned in text, in order, as YYYY-MM-DD strings"""
+    today = today or datetime.now().date()
+    found = []
+    for m in _ISO_DATE.finditer(text):
+        found.append((m.start(), m.group(0)))
+    for m in _MONTH_DATE.finditer(text):
+        month = _MONTHS[m.group(1) or m.group(4)]
+        day = int(m.group(2) or m.group(3))
+        try:
+            date = today.replace(month=month, day=day)
+        except ValueError:
+            continue
+        if date < today:
+            date = date.replace(year=date.year + 1)
+        found.append((m.start(), date.isoformat()))
+    for m in _RELATIVE_DATE.finditer(text):
+        phrase = m.group(1)
+        if phrase == "today":
+            date = today
+        elif phrase == "tomorrow":
+            date = today + timedelta(days=1)
+        elif phrase == "day after tomorrow":
+            date = today + timedelta(days=2)
+        elif phrase == "next week":
+            date = today + timedelta(days=7)
+        elif m.group(2):
+            ahead = (_WEEKDAYS.index(m.group(2)) - today.weekday()) % 7 or 7
+            date = today + timedelta(days=ahead)
+        else:
+            date = today + timedelta(days=_number(m.group(3)))
+        found.append((m.start(), date.isoformat()))
+    return [date for _, date in sorted(found)]
+
+def _flight_slots(text):
+    params = {}
+    m = _FROM_TO.search(text)
+    if m:
+        params["origin"], params["destination"] = _place(m.group(1)), _place(m.group(2))
+    else:
+        m = _TO_FROM.search(text)
+        if m:
+            params["destination"], params["origin"] = _place(m.group(1)), _place(m.group(2))
+        else:
+            m = _TO.search(text)
+            if m:
+                params["destination"] = _place(m.group(1))
+    dates = extract_dates(text)
+    if dates:
+        params["date"] = dates[0]
+    count = _COUNT.search(text)
+    if count:
+        params["passengers"] = _number(count.group(1))
+    return params, ["origin", "destination"]
+
+def _hotel_slots(text):
+    params = {}
+    # Only "in/at/near/to" name a stay's location; "hotel for ..." is a date or a party
+    destination = _first_place(_HOTEL_AT, text)
+    if destination:
+        params["destination"] = destination
+    dates = extract_dates(text)
+    if dates:
+        params["checkin"] = dates[0]
+        nights = _NIGHTS.search(text)
+        if len(dates) > 1:
+            params["checkout"] = dates[1]
+        elif nights:
+            checkin = datetime.strptime(dates[0], "%Y-%m-%d").date()
+            params["checkout"] = (checkin + timedelta(days=_number(nights.group(1)))).isoformat()
+    count = _COUNT.search(text)
+    if count:
+        params["guests"] = _number(count.group(1))
+    return params, ["destination"]
+
+def _shopping_slots(text):
+    for word, query in _PRODUCT_ALIASES.items():
+        if re.search(rf"\b{word}s?\b", text):
+            return {"query": query}, ["query"]
+    m = _PRODUCT_VERBS.search(text)
+    query = text[m.end():] if m else ""
+    query = re.sub(r"\s+(?:for me|please|online|on (?:ebay|aliexpress))\b.*$", "", query).strip(" ,.?!")
+    return ({"query": query} if query else {}), ["query"]
+
+def _recipe_slots(text):
+    m = _RECIPE_QUERY.search(text)
+    query = (m.group(1) or m.group(2) or "").strip() if m else ""
+    query = re.sub(r"^(?:(?:a|an|the|some|me|find|search for|show me|with|using|for|from|of)\s+)+", "", query)
+    return ({"query": query} if query else {}), ["query"]
+
+_SLOTS = {
+    "flight_search": _flight_slots,
+    "hotel_search": _hotel_slots,
+    "shopping": _shopping_slots,
+    "recipe": _recipe_slots,
+}
+
+def _response(intent, params):
+    if intent == "flight_search":
+        return f"Searching flights from {params.get('origin')} to {params.get('destination')}."
+    if intent == "hotel_search":
+        return f"Looking for hotels in {params.get('destination')}."
+    if intent == "shopping":
+        return f"I'll search for {params.get('query')} for you!"
+    if intent == "recipe":
+        return f"Finding recipes for {params.get('query')}."
+    return ""
+
+class IntentRouter:
+    """Resolves common commands locally; route() returns None when the LLM should decide.
+
+    Confidence is the winning intent's share of keyword weight, halved for
+    each required slot the extractors could not fill. A guess resting only
+    on generic verbs ("find", "search") stays below min_confidence.
+    """
+
+    def __init__(self, min_confidence=INTENT_ROUTER_MIN_CONFIDENCE):
+        self.min_confidence = min_confidence
+        self.counters = {"fast_path": 0, "fallback": 0}
+        self._lock = threading.Lock()
+
+    def classify(self, text, intents=None):
+        """Best local IntentMatch for text (any confidence), or None if no keyword hit"""
+        text = " ".join(text.lower().split())
+        scores, generic = {}, 0
+        for m in _AUTOMATON.finditer(text):
+            intent, weight = _INTENT_OF[m.group(0)]
+            if intents is not None and intent not in intents:
+                continue
+            if weight:
+                scores[intent] = scores.get(intent, 0) + weight
+            else:
+                generic += 1
+        generic_only = not scores and generic > 0
+        if generic_only:
+            scores["shopping"] = generic
+        if not scores:
+            return None
+        intent = max(scores, key=scores.get)
+        confidence = scores[intent] / sum(scores.values())
+        if generic_only:
+            confidence = min(confidence, self.min_confidence / 2)
+
+        params, missing = {}, 0
+        if intent in _SLOTS:
+            params, required = _SLOTS[intent](text)
+            missing = sum(1 for slot in required if not params.get(slot))
+            confidence *= 0.5 ** missing
+        # No canned reply for an incomplete match ("I'll search for None")
+        return IntentMatch(intent, params, "" if missing else _response(intent, params), confidence)
+
+    def route(self, text, intents=None):
+        """Confident local match, or None (counted as an LLM fallback)"""
+        match = self.classify(text, intents)
+        confident = match is not None and match.confidence >= self.min_confidence
+        with self._lock:
+            self.counters["fast_path" if confident else "fallback"] += 1
+        return match if confident else None
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        total = counters["fast_path"] + counters["fallback"]
+        counters["hit_rate"] = counters["fast_path"] / total if total else 0.0
+        return counters
+
+router = IntentRouter()
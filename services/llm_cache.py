@@ -0,0 +1,222 @@
+# LLM response cache: exact match on the request, optional near-duplicate lookup
+import atexit
+import os
+import re
+import threading
+import time
+import zlib
+import numpy as np
+from services.response_cache import ResponseCache, DiskBackend, MemoryBackend
+from config import (
+    LLM_CACHE_BACKEND, LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MAX_ENTRIES,
+    LLM_SEMANTIC_CACHE, LLM_SEMANTIC_THRESHOLD, LLM_SEMANTIC_INDEX_SIZE, LLM_SEMANTIC_INDEX_PATH
+)
+
+EMBEDDING_DIMS = 1024
+
+_STOPWORDS = frozenset(
+    "a an the is are was were be to of in on for and or me my i you your "
+    "what what's whats s can could would should do does please tell".split()
+)
+
+_cache = ResponseCache(
+    "llm", LLM_CACHE_TTL, stale_ttl=0,
+    backend=DiskBackend(LLM_CACHE_PATH, max_age=LLM_CACHE_TTL, max_rows=LLM_CACHE_MAX_ENTRIES)
+    if LLM_CACHE_BACKEND == "disk" else MemoryBackend(LLM_CACHE_MAX_ENTRIES)
+)
+
+def _content_words(text):
+    return [t for t in re.findall(r"[a-z0-9']+", text.lower()) if t not in _STOPWORDS]
+
+def signature(text):
+    """Sorted set of content-word stems; near-duplicates must have identical ones.
+
+    The embedding alone scores long prompts that differ in one entity
+    ("Spain" vs "Italy", "7" vs "10 days") as near-identical, so any
+    differing content word rules a match out. Only stopwords, word order,
+    case, punctuation and inflection (hotel/hotels) may differ.
+    """
+    stems = {re.sub(r"(?:ing|ed|es|s)$", "", t) if len(t) > 4 else t for t in _content_words(text)}
+    return " ".join(sorted(stems))
+
+def embed(text, dims=EMBEDDING_DIMS):
+    """Hashed bag of content words and word pairs, L2-normalized (local, no model)"""
+    tokens = _content_words(text)
+    vector = np.zeros(dims, dtype=np.float32)
+    for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+        vector[zlib.crc32(feature.encode()) % dims] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class SemanticIndex:
+    """Fixed-size ring of (scope, embedding, signature, cache key) for near-duplicate lookups.
+
+    Only questions asked in the same scope (model, context messages and
+    sampling parameters) with the same content-word signature can match;
+    the oldest entries are overwritten once the ring is full.
+    """
+
+    def __init__(self, size=LLM_SEMANTIC_INDEX_SIZE, threshold=LLM_SEMANTIC_THRESHOLD):
+        self.size = size
+        self.threshold = threshold
+        self._vectors = np.zeros((size, EMBEDDING_DIMS), dtype=np.float32)
+        self._scopes = [None] * size
+        self._signatures = [None] * size
+        self._keys = [None] * size
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def add(self, scope, text, key):
+        vector = embed(text)
+        if not vector.any():
+            return
+        with self._lock:
+            slot = self._count % self.size
+            self._vectors[slot] = vector
+            self._scopes[slot] = scope
+            self._signatures[slot] = signature(text)
+            self._keys[slot] = key
+            self._count += 1
+
+    def lookup(self, scope, text):
+        """Cache key of the most similar earlier question above the threshold"""
+        vector = embed(text)
+        if not vector.any():
+            return None
+        sig = signature(text)
+        with self._lock:
+            n = min(self._count, self.size)
+            sims = self._vectors[:n] @ vector
+            candidates = [i for i in np.argsort(sims)[::-1] if sims[i] >= self.threshold]
+            return next((self._keys[i] for i in candidates
+                         if self._scopes[i] == scope and self._signatures[i] == sig), None)
+
+    def save(self, path):
+        with self._lock:
+            n = min(self._count, self.size)
+            order = [(self._count - n + i) % self.size for i in range(n)]  # oldest first
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp.npz"
+            np.savez(tmp, vectors=self._vectors[order],
+                     scopes=np.array([self._scopes[i] for i in order], dtype=str),
+                     signatures=np.array([self._signatures[i] for i in order], dtype=str),
+                     keys=np.array([self._keys[i] for i in order], dtype=str))
+            os.replace(tmp, path)
+
+    def load(self, path):
+        with np.load(path) as data:
+            if "signatures" not in data:
+                return  # index written before signatures existed; its entries can't be checked
+            rows = zip(data["vectors"][-self.size:], data["scopes"][-self.size:],
+                       data["signatures"][-self.size:], data["keys"][-self.size:])
+            for vector, scope, sig, key in rows:
+                with self._lock:
+                    slot = self._count % self.size
+                    self._vectors[slot], self._scopes[slot] = vector, str(scope)
+                    self._signatures[slot], self._keys[slot] = str(sig), str(key)
+                    self._count += 1
+
+_index = SemanticIndex()
+_semantic_hits = 0
+_stats_lock = threading.Lock()
+
+if LLM_SEMANTIC_CACHE and os.path.exists(LLM_SEMANTIC_INDEX_PATH):
+    try:
+        _index.load(LLM_SEMANTIC_INDEX_PATH)
+    except Exception as e:
+        print(f"Could not load semantic LLM cache index: {e}")
+
+def _save_index():
+    try:
+        if _index._count:
+            _index.save(LLM_SEMANTIC_INDEX_PATH)
+    except Exception as e:
+        print(f"Could not save semantic LLM cache index: {e}")
+
+if LLM_SEMANTIC_CACHE:
+    atexit.register(_save_index)
+
+class _Request:
+    """One completion request: its cache key and, for semantic lookups, scope and question"""
+
+    def __init__(self, messages, model, semantic, params):
+        self.messages = [{"role": m["role"], "content": m["content"]} for m in messages]
+        self.params = {"model": model, "messages": self.messages, "params": params}
+        self.key = _cache.make_key(self.params)
+        last = self.messages[-1] if self.messages else None
+        self.question = last["content"] if last and last["role"] == "user" else None
+        self.semantic = semantic and LLM_SEMANTIC_CACHE and self.question is not None
+        if self.semantic:
+            self.scope = _cache.make_key({"model": model, "context": self.messages[:-1], "params": params})
+
+    def near_duplicate(self):
+        """Cached answer to a near-duplicate question in the same scope, if any"""
+        global _semantic_hits
+        if not self.semantic:
+            return None
+        try:
+            if _cache.backend.get(self.key) is not None:
+                return None
+            similar = _index.lookup(self.scope, self.question)
+            entry = _cache.backend.get(similar) if similar else None
+        except Exception as e:
+            print(f"Semantic LLM cache lookup failed: {e}")
+            return None
+        if entry is None or time.time() - entry[0] >= _cache.ttl:
+            return None
+        with _stats_lock:
+            _semantic_hits += 1
+        return entry[1]
+
+    def remember(self):
+        if self.semantic:
+            _index.add(self.scope, self.question, self.key)
+
+def cached_completion(client, messages, model, semantic=False, **params):
+    """Content of client.chat.completions.create(...), served from cache when possible.
+
+    Requests are keyed by model, normalized messages and sampling params.
+    With semantic=True a miss also checks earlier questions in the same
+    context whose last user message is a near duplicate of this one.
+    """
+    request = _Request(messages, model, semantic, params)
+    answer = request.near_duplicate()
+    if answer is not None:
+        return answer
+
+    def fetch():
+        response = client.chat.completions.create(messages=request.messages, model=model, **params)
+        content = response.choices[0].message.content
+        request.remember()
+        return content
+
+    return _cache.get_or_fetch(request.params, fetch)
+
+def cached_stream(client, messages, model, semantic=False, **params):
+    """Yield the completion as text deltas; cached answers arrive as one chunk.
+
+    Same keys as cached_completion, so streamed and non-streamed calls
+    share entries. The full text is stored once the stream completes.
+    """
+    request = _Request(messages, model, semantic, params)
+    answer = request.near_duplicate()
+    if answer is None:
+        answer = _cache.peek(request.params)
+    if answer is not None:
+        yield answer
+        return
+
+    parts = []
+    for chunk in client.chat.completions.create(messages=request.messages, model=model, stream=True, **params):
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            parts.append(delta)
+            yield delta
+    _cache.put(request.params, "".join(parts))
+    request.remember()
+
+def llm_cache_stats():
+    stats = _cache.stats()
+    with _stats_lock:
+        stats["semantic_hits"] = _semantic_hits
+    return stats
@@ -0,0 +1,54 @@
+# Shared Neo4j driver with a bounded connection pool
+import atexit
+import threading
+from contextlib import contextmanager
+from neo4j import GraphDatabase
+from config import (
+    NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD,
+    NEO4J_MAX_POOL_SIZE, NEO4J_ACQUISITION_TIMEOUT,
+    NEO4J_LIVENESS_CHECK_TIMEOUT, NEO4J_MAX_CONNECTION_LIFETIME
+)
+
+_driver = None
+_lock = threading.Lock()
+
+def get_driver():
+    """Return the process-wide Neo4j driver, creating it on first use"""
+    global _driver
+    if _driver is None:
+        with _lock:
+            if _driver is None:
+                _driver = GraphDatabase.driver(
+                    NEO4J_URI,
+                    auth=(NEO4J_USERNAME, NEO4J_PASSWORD),
+                    max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+                    connection_acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT,
+                    liveness_check_timeout=NEO4J_LIVENESS_CHECK_TIMEOUT,
+                    max_connection_lifetime=NEO4J_MAX_CONNECTION_LIFETIME
+                )
+    return _driver
+
+@contextmanager
+def get_session(**kwargs):
+    """Borrow a session from the shared driver's pool"""
+    with get_driver().session(**kwargs) as session:
+        yield session
+
+def health_check():
+    """Return True if the database is reachable through the shared driver"""
+    try:
+        get_driver().verify_connectivity()
+        return True
+    except Exception as e:
+        print(f"Neo4j health check failed: {e}")
+        return False
+
+def close_driver():
+    """Close the shared driver and release every pooled connection"""
+    global _driver
+    with _lock:
+        if _driver is not None:
+            _driver.close()
+            _driver = None
+
+atexit.register(close_driver)
@@ -0,0 +1,66 @@
+# Lazy paginated result cursors with background prefetch of the next page
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import PAGINATION_PREFETCH_WORKERS
+
+_prefetch_pool = ThreadPoolExecutor(max_workers=PAGINATION_PREFETCH_WORKERS, thread_name_prefix="page-prefetch")
+
+class PageCursor:
+    """Walks a paginated provider one slice at a time, keeping fetched pages.
+
+    fetch_page(page) returns the items of one page and raises on failure.
+    A page shorter than page_size (or one adding no new items, for providers
+    with an unknown page size) ends the cursor. After each slice the next
+    page is prefetched in the background if the buffer can't cover another
+    slice, so "more results" is usually served without a round-trip.
+    """
+
+    def __init__(self, fetch_page, page_size=None, first_page=1, key=None):
+        self._fetch_page = fetch_page
+        self.page_size = page_size
+        self._next_page = first_page
+        self._key = key
+        self._seen = set()
+        self._items = []
+        self._served = 0
+        self._pending = None  # (page, future) being prefetched
+        self.exhausted = False
+        self._lock = threading.Lock()
+
+    @property
+    def has_more(self):
+        return not self.exhausted or self._served < len(self._items)
+
+    def take(self, n):
+        """Return the next n items (fewer once the provider runs out)"""
+        with self._lock:
+            while len(self._items) - self._served < n and not self.exhausted:
+                self._load_next()
+            batch = self._items[self._served:self._served + n]
+            self._served += len(batch)
+            if not self.exhausted and self._pending is None and len(self._items) - self._served < n:
+                page = self._next_page
+                self._pending = (page, _prefetch_pool.submit(self._fetch_page, page))
+            return batch
+
+    def _load_next(self):
+        # The page number only moves on once a page has been fetched, so a
+        # failed page is requested again by the next take()
+        page = self._next_page
+        if self._pending is not None:
+            (_, future), self._pending = self._pending, None
+            try:
+                items = future.result()
+            except Exception:
+                # A failed prefetch is retried inline so the error reaches the caller
+                items = self._fetch_page(page)
+        else:
+            items = self._fetch_page(page)
+        self._next_page = page + 1
+
+        if self._key is not None:
+            items = [item for item in items if self._key(item) not in self._seen]
+            self._seen.update(self._key(item) for item in items)
+        self._items.extend(items)
+        if not items or (self.page_size is not None and len(items) < self.page_size):
+            self.exhausted = True
@@ -0,0 +1,95 @@
+# Per-host token buckets and a RapidAPI quota ledger
+import threading
+import time
+from config import (
+    RATE_LIMITS, RAPIDAPI_RATE_LIMIT, RATE_LIMIT_MAX_WAIT, RAPIDAPI_QUOTA_RESERVE
+)
+
+class RateLimitError(Exception):
+    """Raised instead of sending a request that the host's budget can't afford"""
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self):
+        """Take a token if available; otherwise return seconds until one is"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout):
+        """Wait up to timeout seconds for a token (queueing); False means shed"""
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self._take()
+            if wait == 0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+_buckets = {}
+_quota = {}  # host -> {"limit", "remaining", "reset_at", "calls"}
+_lock = threading.Lock()
+
+def _is_rapidapi(host):
+    return host.endswith(".rapidapi.com")
+
+def _bucket(host):
+    with _lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            limit = RATE_LIMITS.get(host) or (RAPIDAPI_RATE_LIMIT if _is_rapidapi(host) else None)
+            bucket = _buckets[host] = TokenBucket(*limit) if limit else None
+        return bucket
+
+def acquire(host):
+    """Block until host may be called; raise RateLimitError if it must be shed"""
+    with _lock:
+        quota = _quota.get(host)
+        if quota and quota["remaining"] is not None and quota["remaining"] <= RAPIDAPI_QUOTA_RESERVE:
+            if quota["reset_at"] is None or time.time() < quota["reset_at"]:
+                raise RateLimitError(f"{host}: monthly quota nearly exhausted ({quota['remaining']} left)")
+            quota["remaining"] = None  # reset window passed; trust the next response
+    bucket = _bucket(host)
+    if bucket is not None and not bucket.acquire(RATE_LIMIT_MAX_WAIT):
+        raise RateLimitError(f"{host}: request rate limit reached")
+
+def _header_int(headers, name):
+    try:
+        return int(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def record_response(host, response):
+    """Update the quota ledger from RapidAPI's X-RateLimit-Requests-* headers"""
+    if not _is_rapidapi(host):
+        return
+    headers = response.headers
+    with _lock:
+        quota = _quota.setdefault(host, {"limit": None, "remaining": None, "reset_at": None, "calls": 0})
+        quota["calls"] += 1
+        limit = _header_int(headers, "x-ratelimit-requests-limit")
+        remaining = _header_int(headers, "x-ratelimit-requests-remaining")
+        reset = _header_int(headers, "x-ratelimit-requests-reset")
+        if limit is not None:
+            quota["limit"] = limit
+        if remaining is not None:
+            quota["remaining"] = remaining
+        if reset is not None:
+            quota["reset_at"] = time.time() + reset
+
+def quota_status():
+    """Snapshot of the ledger: {host: {"limit", "remaining", "reset_at", "calls"}}"""
+    with _lock:
+        return {host: dict(quota) for host, quota in _quota.items()}
@@ -0,0 +1,175 @@
+# Materialized per-user recommendation projections refreshed in the background
+import threading
+import time
+from datetime import datetime
+from services.neo4j_pool import get_driver
+from services.graph_writer import add_flush_listener
+from config import (
+    RECOMMENDATION_REFRESH_INTERVAL, RECOMMENDATION_MAX_AGE,
+    RECOMMENDATION_ACTIVE_WINDOW
+)
+
+# Search events that can change a user's projection, and the key holding their user id
+SEARCH_EVENT_USER_KEYS = {
+    "flight_search": "u",
+    "hotel_search": "user_id",
+    "product_search": "user_id",
+    "search_history": "user_id",
+}
+
+_projections = {}  # user_id -> {"destinations", "hotels", "products", "refreshed_at", "_built"}
+_stale = set()
+_active = {}       # user_id -> monotonic time of the last tab visit
+_lock = threading.Lock()
+_refresher = None
+
+def get_recommendations(user_id):
+    """Return the user's projection; only computed live on the first visit"""
+    _ensure_refresher()
+    with _lock:
+        _active[user_id] = time.monotonic()
+        projection = _projections.get(user_id)
+    if projection is None:
+        projection = refresh_user(user_id)
+    return projection
+
+def refresh_user(user_id):
+    """Recompute and store the three recommendation lists for one user"""
+    # Clear the flag before querying so an invalidation arriving mid-refresh survives
+    with _lock:
+        was_stale = user_id in _stale
+        _stale.discard(user_id)
+    driver = get_driver()
+    try:
+        projection = {
+            "destinations": get_recommended_destinations(driver, user_id),
+            "hotels": get_recommended_hotels(driver, user_id),
+            "products": get_recommended_products(driver, user_id),
+            "refreshed_at": datetime.now(),
+            "_built": time.monotonic(),
+        }
+    except Exception:
+        if was_stale:
+            with _lock:
+                if user_id in _active:
+                    _stale.add(user_id)
+        raise
+    with _lock:
+        # A user evicted while we were querying stays evicted
+        if user_id in _active:
+            _projections[user_id] = projection
+    return projection
+
+def invalidate(user_id):
+    """Mark a user's projection for recomputation on the next refresher pass"""
+    with _lock:
+        # Active users include one whose first projection is still being computed
+        if user_id in _active:
+            _stale.add(user_id)
+
+def _on_events_written(event_type, events):
+    key = SEARCH_EVENT_USER_KEYS.get(event_type)
+    if key is None:
+        return
+    for user_id in {e.get(key) for e in events}:
+        invalidate(user_id)
+
+add_flush_listener(_on_events_written)
+
+def _ensure_refresher():
+    global _refresher
+    if _refresher is not None and _refresher.is_alive():
+        return
+    with _lock:
+        if _refresher is None or not _refresher.is_alive():
+            _refresher = threading.Thread(target=_run, name="recommendation-refresher", daemon=True)
+            _refresher.start()
+
+def _run():
+    while True:
+        time.sleep(RECOMMENDATION_REFRESH_INTERVAL)
+        now = time.monotonic()
+        with _lock:
+            # Forget users who haven't opened the tab recently
+            for user_id, seen in list(_active.items()):
+                if now - seen > RECOMMENDATION_ACTIVE_WINDOW:
+                    del _active[user_id]
+                    _projections.pop(user_id, None)
+                    _stale.discard(user_id)
+            due = [
+                user_id for user_id in _active
+                if user_id in _stale
+                or now - _projections.get(user_id, {}).get("_built", 0) > RECOMMENDATION_MAX_AGE
+            ]
+        for user_id in due:
+            try:
+                refresh_user(user_id)
+            except Exception as e:
+                print(f"Recommendation refresh failed for {user_id}: {e}")
+
+# --- Live graph queries (run by the refresher, never on the render path) ---
+def get_recommended_destinations(driver, user_id):
+    query = """
+    MATCH (u:User {id: $user_id})-[:SEARCHED]->(:Search)-[:FOR]->(d:Destination)
+    WITH d, COUNT(*) AS searchCount
+    MATCH (d)-[:HAS_WEATHER]->(w:Weather)
+    WHERE w.season = $current_season
+    OPTIONAL MATCH (d)-[:HAS_FLIGHT]->(f:Flight)
+    WITH d, searchCount, AVG(f.price) AS avgPrice, COLLECT(DISTINCT f.origin)[0] AS origin
+    RETURN d.name AS name, 
+           origin,
+           avgPrice AS avg_price,
+           d.rating AS rating
+    ORDER BY searchCount DESC, d.rating DESC
+    LIMIT 5
+    """
+    
+    seasons = ["winter", "spring", "summer", "fall"]
+    current_month = datetime.now().month
+    current_season = seasons[(current_month % 12) // 3]
+    
+    with driver.session() as session:
+        result = session.run(query, user_id=user_id, current_season=current_season)
+        return [dict(record) for record in result]
+
+def get_recommended_hotels(driver, user_id):
+    query = """
+    MATCH (u:User {id: $user_id})-[:SEARCHED]->(:Search {type: 'hotel'})-[:IN]->(c:City)
+    MATCH (c)<-[:LOCATED_IN]-(h:Hotel)
+    WHERE h.rating >= 4.0
+    OPTIONAL MATCH (h)-[:HAS_AMENITY]->(a:Amenity)
+    WITH h, c, COLLECT(DISTINCT a.name) AS amenities
+    WHERE ANY(amenity IN ['Free WiFi', 'Pool', 'Breakfast'] WHERE amenity IN amenities)
+    RETURN h.name AS name,
+           c.name + ', ' + h.address AS location,
+           h.price AS price,
+           h.rating AS rating,
+           h.reviewCount AS reviews,
+           h.type AS type
+    ORDER BY h.rating DESC
+    LIMIT 5
+    """
+    
+    with driver.session() as session:
+        result = session.run(query, user_id=user_id)
+        return [dict(record) for record in result]
+
+def get_recommended_products(driver, user_id):
+    query = """
+    MATCH (u:User {id: $user_id})-[:SEARCHED]->(:Search {type: 'shopping'})-[:FOR]->(p:Product)
+    WHERE p.category IN ['Luggage', 'Travel Gear', 'Electronics']
+    OPTIONAL MATCH (p)-[:SIMILAR_TO]->(rec:Product)
+    WHERE rec.rating >= 4.0 AND rec.price <= 200
+    WITH COLLECT(DISTINCT p) + COLLECT(DISTINCT rec) AS products
+    UNWIND products AS product
+    RETURN DISTINCT product.name AS name,
+           product.price AS price,
+           product.rating AS rating,
+           product.shipping AS shipping
+    ORDER BY product.rating DESC
+    LIMIT 6
+    """
+    
+    with driver.session() as session:
+        result = session.run(query, user_id=user_id)
+        return [dict(record) for record in result]
@@ -0,0 +1,232 @@
+# Stale-while-revalidate cache for provider search responses
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from services.single_flight import SingleFlight
+from services.rate_limiter import RateLimitError
+from services.circuit_breaker import CircuitOpenError
+from config import (
+    RESPONSE_CACHE_BACKEND, RESPONSE_CACHE_PATH, RESPONSE_CACHE_MEMORY_SIZE,
+    RESPONSE_CACHE_TTLS, RESPONSE_CACHE_STALE_TTL
+)
+
+# --- Backends: get(key) -> (stored_at, value) | None, set(key, value, stored_at) ---
+class MemoryBackend:
+    def __init__(self, maxsize=RESPONSE_CACHE_MEMORY_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, value, stored_at):
+        with self._lock:
+            self._data[key] = (stored_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+class DiskBackend:
+    """SQLite-backed store shared by every worker process; values must be JSON.
+
+    Pruning drops rows older than max_age and, with max_rows set, the
+    oldest rows beyond that count.
+    """
+    PRUNE_EVERY = 200
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, max_age=7 * 24 * 3600, max_rows=None):
+        self.path = path
+        self.max_age = max_age
+        self.max_rows = max_rows
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, stored_at REAL NOT NULL, value TEXT NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            "SELECT stored_at, value FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def set(self, key, value, stored_at):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, stored_at, value) VALUES (?, ?, ?)",
+                (key, stored_at, json.dumps(value))
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM responses WHERE stored_at < ?", (time.time() - self.max_age,))
+                if self.max_rows:
+                    conn.execute(
+                        "DELETE FROM responses WHERE key IN "
+                        "(SELECT key FROM responses ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_rows,)
+                    )
+
+def _make_backend():
+    return DiskBackend() if RESPONSE_CACHE_BACKEND == "disk" else MemoryBackend()
+
+# --- Cache ---
+_refresh_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-revalidate")
+
+def _normalize(value):
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+class ResponseCache:
+    def __init__(self, name, ttl, stale_ttl=RESPONSE_CACHE_STALE_TTL, backend=None):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.backend = backend or _make_backend()
+        self.counters = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "errors": 0, "quota_fallbacks": 0}
+        self._refreshing = set()
+        self._inflight = SingleFlight()
+        self._lock = threading.Lock()
+
+    def make_key(self, params):
+        blob = json.dumps(_normalize(params), sort_keys=True, default=str)
+        return f"{self.name}:{hashlib.sha1(blob.encode()).hexdigest()}"
+
+    def _count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def get_or_fetch(self, params, fetch, should_cache=bool):
+        """Return a cached response for params, calling fetch() on a miss.
+
+        Fresh entries are returned directly. Entries past their TTL but
+        within the stale window are returned immediately while fetch()
+        refreshes them in the background. Results failing should_cache
+        (empty by default) are returned but not stored. If the provider's
+        rate/quota budget sheds the call or its circuit is open, any older
+        entry is served instead.
+        """
+        key = self.make_key(params)
+        try:
+            entry = self.backend.get(key)
+        except Exception as e:
+            print(f"Response cache '{self.name}' read failed: {e}")
+            entry = None
+
+        if entry is not None:
+            stored_at, value = entry
+            age = time.time() - stored_at
+            if age < self.ttl:
+                self._count("hits")
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self._count("stale_hits")
+                self._revalidate(key, fetch, should_cache)
+                return value
+
+        self._count("misses")
+        try:
+            # Sessions missing the same key at once share a single upstream call
+            return self._inflight.do(key, self._fetch_and_store, key, fetch, should_cache)
+        except (RateLimitError, CircuitOpenError):
+            if entry is None:
+                raise
+            self._count("quota_fallbacks")
+            return entry[1]
+
+    def peek(self, params):
+        """Fresh cached value for params, or None (counted as a miss; never fetches)"""
+        try:
+            entry = self.backend.get(self.make_key(params))
+        except Exception as e:
+            print(f"Response cache '{self.name}' read failed: {e}")
+            return None
+        if entry is not None and time.time() - entry[0] < self.ttl:
+            self._count("hits")
+            return entry[1]
+        self._count("misses")
+        return None
+
+    def put(self, params, value, should_cache=bool):
+        """Store a value produced outside get_or_fetch (e.g. a finished stream)"""
+        self._store(self.make_key(params), value, should_cache)
+
+    def _fetch_and_store(self, key, fetch, should_cache):
+        value = fetch()
+        self._store(key, value, should_cache)
+        return value
+
+    def _store(self, key, value, should_cache):
+        if not should_cache(value):
+            return
+        try:
+            self.backend.set(key, value, time.time())
+        except Exception as e:
+            print(f"Response cache '{self.name}' write failed: {e}")
+
+    def _revalidate(self, key, fetch, should_cache):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._store(key, fetch(), should_cache)
+                self._count("refreshes")
+            except Exception as e:
+                self._count("errors")
+                print(f"Response cache '{self.name}' refresh failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        _refresh_pool.submit(refresh)
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        counters["coalesced"] = self._inflight.shared
+        lookups = counters["hits"] + counters["stale_hits"] + counters["misses"]
+        counters["hit_rate"] = (counters["hits"] + counters["stale_hits"]) / lookups if lookups else 0.0
+        return counters
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_cache(name):
+    """Shared ResponseCache for a provider family ("flights", "hotels", "products", ...)"""
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = _caches[name] = ResponseCache(name, RESPONSE_CACHE_TTLS.get(name, 900))
+        return cache
+
+def cache_stats():
+    with _caches_lock:
+        return {name: cache.stats() for name, cache in _caches.items()}
@@ -0,0 +1,95 @@
+from datetime import date
+
+from services.intent_router import IntentRouter, TRAVEL_INTENTS, SHOPPING_INTENTS, extract_dates
+
+
+def make_router():
+    return IntentRouter(min_confidence=0.75)
+
+
+def test_generic_verbs_alone_fall_back_to_llm():
+    router = make_router()
+    for text in ("find restaurants in paris", "can you find something to do in rome", "search for sunglasses"):
+        assert router.route(text, TRAVEL_INTENTS) is None
+        match = router.classify(text, TRAVEL_INTENTS)
+        assert match.intent == "shopping"
+        assert match.confidence < router.min_confidence
+
+
+def test_generic_verb_with_product_noun_is_confident():
+    match = make_router().route("find a backpack", SHOPPING_INTENTS)
+    assert match.intent == "shopping"
+    assert match.parameters == {"query": "travel backpack"}
+
+
+def test_shopping_keyword_is_confident():
+    match = make_router().route("buy sunglasses", SHOPPING_INTENTS)
+    assert match.parameters == {"query": "sunglasses"}
+
+
+def test_recipe_query_drops_leading_preposition():
+    router = make_router()
+    assert router.route("what can I cook with eggs", TRAVEL_INTENTS).parameters == {"query": "eggs"}
+    assert router.route("recipes for pad thai", TRAVEL_INTENTS).parameters == {"query": "pad thai"}
+    assert router.route("what can i bake using apples", TRAVEL_INTENTS).parameters == {"query": "apples"}
+
+
+def test_flight_slots():
+    match = make_router().route("fly from London to New York on 2030-05-04 for 2 passengers", TRAVEL_INTENTS)
+    assert match.intent == "flight_search"
+    assert match.parameters == {"origin": "London", "destination": "New York", "date": "2030-05-04", "passengers": 2}
+
+
+def test_flight_without_origin_falls_back():
+    assert make_router().route("book a flight to paris", TRAVEL_INTENTS) is None
+
+
+def test_cart_commands():
+    router = make_router()
+    assert router.route("clear the cart", SHOPPING_INTENTS).intent == "cart_clear"
+    assert router.route("show my cart", SHOPPING_INTENTS).intent == "cart_view"
+    assert router.route("place my order", SHOPPING_INTENTS).intent == "checkout"
+
+
+def test_intents_outside_the_allowed_set_are_ignored():
+    assert make_router().route("show my cart", TRAVEL_INTENTS) is None
+
+
+def test_stats_count_fast_path_and_fallback():
+    router = make_router()
+    router.route("buy sunglasses", SHOPPING_INTENTS)
+    router.route("hello there", SHOPPING_INTENTS)
+    assert router.stats() == {"fast_path": 1, "fallback": 1, "hit_rate": 0.5}
+
+
+def test_extract_dates():
+    today = date(2026, 10, 18)
+    assert extract_dates("leaving tomorrow and back on 2026-10-25", today) == ["2026-10-19", "2026-10-25"]
+    assert extract_dates("march 3rd", today) == ["2027-03-03"]
+
+
+def test_bare_shopping_verb_has_no_query_or_reply():
+    match = make_router().classify("I want to buy", SHOPPING_INTENTS)
+    assert match.intent == "shopping"
+    assert match.parameters == {}
+    assert match.response == ""
+
+
+def test_hotel_for_phrases_are_not_destinations():
+    router = make_router()
+    for text in ("find me a hotel for tonight", "I need a hotel for my family",
+                 "cheap hotel for the weekend", "hotels near the airport"):
+        assert router.route(text, TRAVEL_INTENTS) is None
+        assert "destination" not in router.classify(text, TRAVEL_INTENTS).parameters
+
+
+def test_hotel_destination_skips_non_place_captures():
+    match = make_router().route("I need a hotel for my trip to rome", TRAVEL_INTENTS)
+    assert match.parameters["destination"] == "Rome"
+
+
+def test_hotel_slots():
+    match = make_router().route("hotel in new york on 2030-03-03 for 2 nights for 2 guests", TRAVEL_INTENTS)
+    assert match.intent == "hotel_search"
+    assert match.parameters == {"destination": "New York", "checkin": "2030-03-03",
+                                "checkout": "2030-03-05", "guests": 2}
@@ -1,5 +1,4 @@
 import streamlit as st
-import requests
 import json
 from datetime import datetime, timedelta
 import pandas as pd
@@ -11,7 +10,16 @@ import time
 import os
 from dotenv import load_dotenv
 import neo4j
-from neo4j import GraphDatabase
+from services import http_client, fx_rates
+from services.geocode_cache import locationiq_search
+from services.neo4j_pool import get_session
+from services.graph_writer import register_event_type, enqueue
+from services.graph_schema import ensure_schema
+from services.fanout import fan_out
+from services.response_cache import get_cache
+from services.llm_cache import cached_completion
+from services.intent_router import router as intent_router, TRAVEL_INTENTS
+from config import PRODUCT_SEARCH_DEADLINE, HTTP_CONNECT_TIMEOUT
 import plotly.graph_objects as go
 import plotly.express as px
 import asyncio
@@ -201,7 +209,7 @@ def coral_send_data(data_type: str, data: Dict):
             "X-CORAL-AUTH": os.getenv("CORAL_AUTH_TOKEN", "default_token")
         }
         
-        response = requests.post(
+        response = http_client.post(
             f"{CORAL_SERVER_URL}/ingest",
             data=json.dumps(payload),
             headers=headers,
@@ -255,8 +263,8 @@ def search_flights(origin, destination, departure_date, passengers=1):
         "X-RapidAPI-Host": "aerodatabox.p.rapidapi.com"
     }
     
-    try:
-        response = requests.get(url, headers=headers, params=querystring)
+    def fetch():
+        response = http_client.get(url, headers=headers, params=querystring)
         if response.status_code == 200:
             flights = response.json()
             # Filter flights going to our destination
@@ -266,30 +274,26 @@ def search_flights(origin, destination, departure_date, passengers=1):
             ]
             return filtered_flights[:5]  # Return top 5 flights
         return []
+
+    try:
+        return get_cache("flights").get_or_fetch(
+            {"provider": "aerodatabox", "origin": origin, "destination": destination, "date": departure_date},
+            fetch
+        )
     except Exception as e:
         st.error(f"Error fetching flights: {str(e)}")
         return []
 
 def get_location_info(city):
-    """Get location info using LocationIQ API"""
-    url = f"https://us1.locationiq.com/v1/search.php"
-    params = {
-        "key": locationiq_key,
-        "q": city,
-        "format": "json",
-        "limit": 1
-    }
-    
+    """Get location info using LocationIQ API (via the shared geocode cache)"""
     try:
-        response = requests.get(url, params=params)
-        if response.status_code == 200:
-            data = response.json()
-            if data:
-                return {
-                    "city": data[0].get("display_name", city),
-                    "lat": float(data[0].get("lat", 0)),
-                    "lon": float(data[0].get("lon", 0))
-                }
+        data = locationiq_search(city)
+        if data:
+            return {
+                "city": data.get("display_name", city),
+                "lat": float(data.get("lat", 0)),
+                "lon": float(data.get("lon", 0))
+            }
     except Exception as e:
         st.error(f"Location error: {str(e)}")
     
@@ -320,18 +324,21 @@ def search_hotels(destination, checkin_date, checkout_date, guests=1):
         "X-RapidAPI-Host": "booking-com.p.rapidapi.com"
     }
     
-    try:
-        response = requests.get(url, headers=headers, params=querystring)
+    def fetch():
+        response = http_client.get(url, headers=headers, params=querystring)
         if response.status_code == 200:
             return response.json().get('result', [])[:5]  # Return top 5 hotels
         return []
+
+    try:
+        return get_cache("hotels").get_or_fetch(dict(querystring, provider="booking-com"), fetch)
     except Exception as e:
         st.error(f"Error fetching hotels: {str(e)}")
         return []
 
 # Shopping Functions
-def search_ebay_products(query):
-    """Search products on eBay"""
+def fetch_ebay_products(query):
+    """Top eBay results for query (raises on transport and HTTP errors)"""
     url = "https://ebay-search-result.p.rapidapi.com/search/" + query
     
     headers = {
@@ -339,17 +346,12 @@ def search_ebay_products(query):
         "X-RapidAPI-Host": "ebay-search-result.p.rapidapi.com"
     }
     
-    try:
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            return response.json().get('results', [])[:5]  # Return top 5 results
-        return []
-    except Exception as e:
-        st.error(f"Error searching eBay: {str(e)}")
-        return []
+    response = http_client.get(url, headers=headers, timeout=(HTTP_CONNECT_TIMEOUT, PRODUCT_SEARCH_DEADLINE))
+    response.raise_for_status()
+    return response.json().get('results', [])[:5]  # Return top 5 results
 
-def search_aliexpress_products(query):
-    """Search products on AliExpress"""
+def fetch_aliexpress_products(query):
+    """Top AliExpress results for query (raises on transport and HTTP errors)"""
     url = "https://aliexpress-datahub.p.rapidapi.com/item_search"
     
     querystring = {"q": query, "page": "1"}
@@ -359,15 +361,46 @@ def search_aliexpress_products(query):
         "X-RapidAPI-Host": "aliexpress-datahub.p.rapidapi.com"
     }
     
+    response = http_client.get(url, headers=headers, params=querystring, timeout=(HTTP_CONNECT_TIMEOUT, PRODUCT_SEARCH_DEADLINE))
+    response.raise_for_status()
+    return response.json().get('result', {}).get('resultList', [])[:5]  # Return top 5 results
+
+def cached_ebay_products(query):
+    return get_cache("products").get_or_fetch(
+        {"provider": "ebay", "query": query}, lambda: fetch_ebay_products(query))
+
+def cached_aliexpress_products(query):
+    return get_cache("products").get_or_fetch(
+        {"provider": "aliexpress-datahub", "query": query}, lambda: fetch_aliexpress_products(query))
+
+def search_ebay_products(query):
+    """Search products on eBay"""
     try:
-        response = requests.get(url, headers=headers, params=querystring)
-        if response.status_code == 200:
-            return response.json().get('result', {}).get('resultList', [])[:5]  # Return top 5 results
+        return cached_ebay_products(query)
+    except Exception as e:
+        st.error(f"Error searching eBay: {str(e)}")
         return []
+
+def search_aliexpress_products(query):
+    """Search products on AliExpress"""
+    try:
+        return cached_aliexpress_products(query)
     except Exception as e:
         st.error(f"Error searching AliExpress: {str(e)}")
         return []
 
+def search_all_products(query, platforms=("ebay", "aliexpress")):
+    """Query the marketplaces concurrently; returns (ebay, aliexpress, timed_out)"""
+    fetchers = {"ebay": cached_ebay_products, "aliexpress": cached_aliexpress_products}
+    tasks = {name: (lambda fetch=fetchers[name]: fetch(query)) for name in platforms}
+    results, timed_out, errors = fan_out(tasks, PRODUCT_SEARCH_DEADLINE)
+
+    for name, e in errors.items():
+        st.error(f"Error searching {name}: {str(e)}")
+    if timed_out:
+        st.warning(f"{', '.join(timed_out)} took too long; showing partial results")
+    return results.get("ebay", []), results.get("aliexpress", []), timed_out
+
 # Recipe Functions
 def search_recipes(query):
     """Search recipes using Spoonacular API"""
@@ -381,7 +414,7 @@ def search_recipes(query):
     }
     
     try:
-        response = requests.get(url, params=params)
+        response = http_client.get(url, params=params)
         if response.status_code == 200:
             return response.json().get('results', [])
         return []
@@ -399,7 +432,7 @@ def get_recipe_details(recipe_id):
     }
     
     try:
-        response = requests.get(url, params=params)
+        response = http_client.get(url, params=params)
         if response.status_code == 200:
             return response.json()
         return None
@@ -408,35 +441,27 @@ def get_recipe_details(recipe_id):
         return None
 
 # Knowledge Graph Functions
+register_event_type("search_history", """
+UNWIND $events AS e
+MERGE (u:User {id: e.user_id})
+CREATE (s:Search {
+    type: e.search_type,
+    params: e.search_params,
+    timestamp: datetime(e.ts)
+})
+CREATE (u)-[:PERFORMED]->(s)
+""")
+
 def store_search_history(user_id, search_type, search_params):
-    """Store search history in Neo4j"""
+    """Queue search history for the background Neo4j writer"""
     if not neo4j_uri:
         return False
-        
-    try:
-        driver = GraphDatabase.driver(neo4j_uri, auth=(neo4j_user, neo4j_password))
-        
-        with driver.session() as session:
-            query = """
-            MERGE (u:User {id: $user_id})
-            CREATE (s:Search {
-                type: $search_type,
-                params: $search_params,
-                timestamp: datetime()
-            })
-            CREATE (u)-[:PERFORMED]->(s)
-            """
-            session.run(query, 
-                user_id=user_id,
-                search_type=search_type,
-                search_params=json.dumps(search_params)
-            )
-            
-        return True
-        
-    except Exception as e:
-        st.error(f"Knowledge graph error: {str(e)}")
-        return False
+
+    return enqueue("search_history",
+        user_id=user_id,
+        search_type=search_type,
+        search_params=json.dumps(search_params)
+    )
 
 def get_search_history(user_id):
     """Get search history from Neo4j"""
@@ -444,9 +469,7 @@ def get_search_history(user_id):
         return []
         
     try:
-        driver = GraphDatabase.driver(neo4j_uri, auth=(neo4j_user, neo4j_password))
-        
-        with driver.session() as session:
+        with get_session() as session:
             query = """
             MATCH (u:User {id: $user_id})-[:PERFORMED]->(s:Search)
             RETURN s.type AS type, s.params AS params, s.timestamp AS timestamp
@@ -462,15 +485,10 @@ def get_search_history(user_id):
 
 # Currency Conversion
 def convert_currency(amount, from_currency, to_currency):
-    """Convert currency using ExchangeRate-API"""
-    url = f"https://v6.exchangerate-api.com/v6/{exchange_rate_key}/pair/{from_currency}/{to_currency}/{amount}"
-    
+    """Convert currency using the shared ExchangeRate-API rate table (no per-amount call)"""
     try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            return data.get('conversion_result', amount)
-        return amount
+        converted = float(fx_rates.convert([amount], from_currency, to_currency)[0])
+        return amount if converted != converted else converted  # NaN: amount wasn't numeric
     except Exception as e:
         st.error(f"Currency conversion error: {str(e)}")
         return amount
@@ -496,7 +514,8 @@ def generate_recommendations(user_id):
     
     # Generate recommendations using GROQ
     try:
-        response = groq_client.chat.completions.create(
+        content = cached_completion(
+            groq_client,
             messages=[
                 {
                     "role": "system",
@@ -504,14 +523,14 @@ def generate_recommendations(user_id):
                 },
                 {
                     "role": "user",
-                    "content": f"User interests: {', '.join(interests)}. Please recommend 3 travel destinations or activities."
+                    "content": f"User interests: {', '.join(sorted(interests))}. Please recommend 3 travel destinations or activities."
                 }
             ],
             model="llama3-70b-8192",
             max_tokens=300
         )
         
-        recommendations = response.choices[0].message.content.split("\n")
+        recommendations = content.split("\n")
         return [rec for rec in recommendations if rec.strip() and len(rec) > 10][:3]
     
     except Exception as e:
@@ -520,6 +539,10 @@ def generate_recommendations(user_id):
 
 # Main App
 def main():
+    # Make sure Neo4j constraints/indexes exist (once per process, on a background thread)
+    if neo4j_uri:
+        ensure_schema()
+
     # Coral badge
     if CORAL_PROTOCOL_ENABLED:
         st.markdown('<div class="coral-badge">CORAL Protocol Active</div>', unsafe_allow_html=True)
@@ -583,32 +606,37 @@ def main():
         </div>
         """, unsafe_allow_html=True)
         
-        # Process voice input with Groq
+        # Common commands are resolved locally; only the rest go to Groq
         try:
-            response = groq_client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """You are a helpful travel assistant. Analyze the user's request and determine the intent. 
+            match = intent_router.route(st.session_state.voice_input, TRAVEL_INTENTS)
+            if match:
+                intent, parameters, ai_response = match.intent, match.parameters, match.response
+            else:
+                content = cached_completion(
+                    groq_client,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": """You are a helpful travel assistant. Analyze the user's request and determine the intent. 
                         Respond with a JSON object containing: 
                         - intent (flight_search, hotel_search, shopping, recipe, general_question)
                         - parameters (extracted from the request)
                         - response (your natural language response)
                         """
-                    },
-                    {
-                        "role": "user",
-                        "content": st.session_state.voice_input
-                    }
-                ],
-                model="llama3-8b-8192",
-                response_format={"type": "json_object"}
-            )
+                        },
+                        {
+                            "role": "user",
+                            "content": st.session_state.voice_input
+                        }
+                    ],
+                    model="llama3-8b-8192",
+                    response_format={"type": "json_object"}
+                )
 
-            parsed_response = json.loads(response.choices[0].message.content)
-            intent = parsed_response.get('intent', 'general_question')
-            parameters = parsed_response.get('parameters', {})
-            ai_response = parsed_response.get('response', "I'll help with that.")
+                parsed_response = json.loads(content)
+                intent = parsed_response.get('intent', 'general_question')
+                parameters = parsed_response.get('parameters', {})
+                ai_response = parsed_response.get('response', "I'll help with that.")
 
             # Store conversation
             st.session_state.conversation.append({
@@ -784,8 +812,7 @@ def main():
             
             with st.spinner("Searching for products..."):
                 try:
-                    ebay_results = search_ebay_products(query)
-                    aliexpress_results = search_aliexpress_products(query)
+                    ebay_results, aliexpress_results, _ = search_all_products(query)
                     
                     st.session_state.products = {
                         'ebay': ebay_results,
@@ -958,14 +985,8 @@ def main():
         
         if st.button("Search Products", key="manual_product_search"):
             with st.spinner("Searching products..."):
-                ebay_results = []
-                aliexpress_results = []
-                
-                if platform in ["eBay", "Both"]:
-                    ebay_results = search_ebay_products(product_query)
-                
-                if platform in ["AliExpress", "Both"]:
-                    aliexpress_results = search_aliexpress_products(product_query)
+                platforms = {"eBay": ("ebay",), "AliExpress": ("aliexpress",)}.get(platform, ("ebay", "aliexpress"))
+                ebay_results, aliexpress_results, _ = search_all_products(product_query, platforms)
                 
                 st.session_state.products = {
                     'ebay': ebay_results,
@@ -1018,7 +1039,7 @@ def main():
                 "X-RapidAPI-Host": "yelp-com.p.rapidapi.com"
             }
             try:
-                response = requests.get(url, headers=headers, params=querystring)
+                response = http_client.get(url, headers=headers, params=querystring)
                 if response.status_code == 200:
                     return response.json().get('businesses', [])
                 return []
@@ -1034,7 +1055,7 @@ def main():
                 "X-RapidAPI-Host": "yelp-com.p.rapidapi.com"
             }
             try:
-                response = requests.get(url, headers=headers)
+                response = http_client.get(url, headers=headers)
                 if response.status_code == 200:
                     return response.json().get('menu', [])
                 return []